@@ -0,0 +1,159 @@
+"""
+asyncio API for the converter.
+
+File reading and writing run in the loop's default thread pool, and the
+CPU-heavy stages (merge, postprocess and rendering) run in a shared process
+pool, so many conversions can be awaited from one event loop without
+blocking it:
+
+    async for progress in iter_conversion("ep01.json", "ep01.srt"):
+        print(progress.stage, progress.percent)
+
+    results = await convert_many(["ep01.json", "ep02.json"], output_dir="out")
+
+Cancelling the awaiting task cancels the conversion: a stage not yet
+started in the pool is dropped, and no write starts after cancellation
+(writes are atomic, so an output is never left half written).
+"""
+import os
+import asyncio
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import output_path_for
+from converter import load_subtitles, apply_subtitle_rules, render_srt, resolve_rules
+from utils.output_writer import write_if_changed
+
+# Evento de progreso: etapa, porcentaje (0-100) y, en el último, el resultado
+ConversionProgress = namedtuple("ConversionProgress", ["stage", "percent", "result"])
+
+# Etapas de iter_conversion
+LOADED = "loaded"
+CONVERTED = "converted"
+DONE = "done"
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the shared executor for the CPU-heavy stages, creating a process
+    pool (one worker per core) the first time.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor()
+        return _executor
+
+
+def set_executor(executor):
+    """
+    Replaces the shared executor (e.g. with a pool of a given size, or a
+    ThreadPoolExecutor where processes are not wanted). The previous one is
+    not shut down.
+    """
+    global _executor
+    with _executor_lock:
+        _executor = executor
+
+
+def shutdown_executor(wait=True):
+    """Shuts down the shared executor; the next conversion creates a new one."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=wait)
+
+
+def _render(subtitles, top_characters, rules, dialog_rules=None):
+    """Merge, postprocess and render stage, run in the shared executor."""
+    final_subs = apply_subtitle_rules(subtitles, rules, dialog_rules)
+    return render_srt(final_subs, top_characters), len(final_subs)
+
+
+async def iter_conversion(json_file, output_file=None, fps=25, rules=None, input_options=None,
+                          dialog_rules=None):
+    """
+    Converts one file, yielding a ConversionProgress after each stage.
+
+    Args:
+        json_file (str): Input JSON/CSV/TSV file
+        output_file (str): Output SRT (next to the input by default)
+        fps (int): Frames per second of the timecodes
+        rules (dict): Subtitle rules overriding DEFAULT_RULES
+        input_options (dict): Options for CSV/TSV inputs (see utils.input_adapters)
+        dialog_rules (dict): Dialog normalization rules (see utils.dialog_normalizer)
+
+    Yields:
+        ConversionProgress: ("loaded", 20, None), ("converted", 90, None) and
+        finally ("done", 100, result), where result is a dict with input,
+        output, status ("written"/"unchanged"), output_hash and subtitles.
+
+    Raises:
+        Any error of the conversion, as process_json_to_srt does.
+    """
+    loop = asyncio.get_running_loop()
+    rules = resolve_rules(rules)
+    output_file = output_file or output_path_for(json_file)
+
+    subtitles, top_characters = await loop.run_in_executor(
+        None, lambda: load_subtitles(json_file, fps, input_options=input_options, dialog_rules=dialog_rules)
+    )
+    yield ConversionProgress(LOADED, 20, None)
+
+    srt_text, count = await loop.run_in_executor(get_executor(), _render, subtitles, top_characters, rules,
+                                                 dialog_rules)
+    yield ConversionProgress(CONVERTED, 90, None)
+
+    written, digest = await loop.run_in_executor(None, write_if_changed, output_file, srt_text)
+    result = {"input": json_file, "output": output_file, "status": "written" if written else "unchanged",
+              "output_hash": digest, "subtitles": count}
+    yield ConversionProgress(DONE, 100, result)
+
+
+async def convert_async(json_file, output_file=None, fps=25, rules=None, input_options=None,
+                        dialog_rules=None):
+    """
+    Converts one file without blocking the event loop.
+
+    Returns:
+        dict: The result of the conversion (see iter_conversion)
+    """
+    async for progress in iter_conversion(json_file, output_file, fps, rules, input_options, dialog_rules):
+        if progress.stage == DONE:
+            return progress.result
+
+
+async def convert_many(inputs, output_dir=None, fps=25, rules=None, input_options=None, limit=None,
+                       dialog_rules=None):
+    """
+    Converts many files concurrently from one event loop.
+
+    Args:
+        inputs (list): Input files
+        output_dir (str): Output folder (next to each input by default)
+        limit (int): Maximum conversions in flight at once (None = no limit;
+            the CPU stages are bounded by the shared executor anyway)
+
+    Returns:
+        list: One result per input, in input order. A failed conversion
+              gives {"input": ..., "status": "failed", "error": ...} instead
+              of stopping the others; cancellation still propagates.
+    """
+    if output_dir:
+        await asyncio.get_running_loop().run_in_executor(None, lambda: os.makedirs(output_dir, exist_ok=True))
+    semaphore = asyncio.Semaphore(limit or max(1, len(inputs)))
+
+    async def run(json_file):
+        try:
+            async with semaphore:
+                return await convert_async(json_file, output_path_for(json_file, output_dir),
+                                           fps, rules, input_options, dialog_rules)
+        except Exception as e:
+            return {"input": json_file, "status": "failed", "error": str(e)}
+
+    return list(await asyncio.gather(*(run(json_file) for json_file in inputs)))
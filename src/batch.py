@@ -0,0 +1,431 @@
+"""
+Batch operations over many JSON files (QC reports and conversions).
+"""
+import os
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from converter import convert_file, render_srt, resolve_rules
+from utils.input_adapters import TABULAR_EXTENSIONS
+from utils.qc import check_subtitles, aggregate_reports
+from utils.journal import BatchJournal, job_key, STARTED, DONE, FAILED
+from utils.output_writer import RunManifest, file_hash, hash_bytes, encode_text, write_if_changed
+from utils.archive_writer import ArchiveWriter
+from utils.scheduler import estimate_job, run_jobs
+from utils.dialog_normalizer import resolve_dialog_rules
+from utils.character_index import CharacterIndex
+
+logger = logging.getLogger(__name__)
+
+# Extensiones de entrada reconocidas al recorrer carpetas
+INPUT_EXTENSIONS = (".json",) + TABULAR_EXTENSIONS
+
+
+def collect_inputs(paths, extensions=INPUT_EXTENSIONS):
+    """
+    Expands a list of files and directories into the list of input files.
+
+    Directories are walked recursively and only files with one of the given
+    extensions are kept. The result is sorted and free of duplicates.
+    """
+    inputs = set()
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in files:
+                    if name.lower().endswith(extensions):
+                        inputs.add(os.path.join(root, name))
+        else:
+            inputs.add(path)
+    return sorted(inputs)
+
+
+def output_path_for(json_file, output_dir=None, extension=".srt"):
+    """
+    Builds the output path for an input file (same name, .json -> .srt).
+
+    If output_dir is given the file goes there, otherwise next to the input.
+    """
+    output_file = os.path.splitext(json_file)[0] + extension
+    if output_dir:
+        output_file = os.path.join(output_dir, os.path.basename(output_file))
+    return output_file
+
+
+def index_series(inputs, index_path, series, input_options=None, series_root=None):
+    """
+    Adds (or refreshes) every input in the series character index and returns
+    the main characters of the whole series.
+
+    The index is updated before any file is converted, so every SRT of a
+    batch gets its colors from the same ranking. Inputs that cannot be read
+    are skipped here; their conversion reports the error. Two inputs with the
+    same episode key (see CharacterIndex.episode_keys) stop the batch first.
+    """
+    if not series:
+        raise ValueError("A character index needs a series name")
+    with CharacterIndex(index_path, series_root) as index:
+        index.episode_keys(inputs)
+        for json_file in inputs:
+            try:
+                index.index_file(series, json_file, input_options=input_options)
+            except Exception as e:
+                logger.warning(f"Could not index {json_file}: {e}")
+        return index.get_top_characters(series)
+
+
+def qc_rule_values(rules):
+    """
+    Returns the subset of subtitle rules that check_subtitles understands.
+    """
+    return {key: value for key, value in resolve_rules(rules).items() if key != "max_gap"}
+
+
+def qc_file(json_file, fps=25, rules=None, output_dir=None, check_only=True, input_options=None,
+            validate=False, dialog_rules=None, top_characters=None):
+    """
+    Converts one file in memory and returns its QC report.
+
+    When check_only is False the SRT is also written. Errors are reported in
+    the result instead of being raised, so one bad file does not stop a batch.
+    """
+    report = {"file": json_file}
+    try:
+        final_subs, top_characters = convert_file(json_file, fps, rules, input_options=input_options,
+                                                  validate=validate, dialog_rules=dialog_rules,
+                                                  top_characters=top_characters)
+        report.update(check_subtitles(final_subs, **qc_rule_values(rules)))
+
+        if not check_only:
+            output_file = output_path_for(json_file, output_dir)
+            write_if_changed(output_file, render_srt(final_subs, top_characters))
+            report["output"] = output_file
+    except Exception as e:
+        logger.error(f"QC failed for {json_file}: {e}")
+        report["error"] = str(e)
+    return report
+
+
+def run_qc_batch(inputs, fps=25, rules=None, workers=None, output_dir=None, check_only=True,
+                 input_options=None, validate=False, dialog_rules=None, index_path=None, series=None,
+                 series_root=None):
+    """
+    Runs QC over many files in parallel.
+
+    Args:
+        inputs (list): Input JSON files
+        fps (int): Frames per second of the timecodes
+        rules (dict): Subtitle rules overriding DEFAULT_RULES
+        workers (int): Number of worker processes (None = one per core, 1 = no pool)
+        output_dir (str): Where to write SRTs when check_only is False
+        check_only (bool): If True, nothing is written
+        input_options (dict): Options for CSV/TSV inputs (see utils.input_adapters)
+        validate (bool): Validate each input first (see utils.validation)
+        dialog_rules (dict): Dialog normalization rules (see utils.dialog_normalizer)
+        index_path (str): Series character index (SQLite) to add the inputs to;
+            the written SRTs take their colors from the series ranking
+        series (str): Series name in the index
+        series_root (str): Folder the episode keys are relative to (see
+            utils.character_index.episode_name)
+
+    Returns:
+        tuple: (list of per-file reports in input order, aggregate report)
+    """
+    # Validar las reglas antes de repartir el trabajo
+    resolve_rules(rules)
+    resolve_dialog_rules(dialog_rules)
+    if output_dir and not check_only:
+        os.makedirs(output_dir, exist_ok=True)
+    top_characters = index_series(inputs, index_path, series, input_options, series_root) if index_path else None
+
+    job = partial(qc_file, fps=fps, rules=rules, output_dir=output_dir, check_only=check_only,
+                  input_options=input_options, validate=validate, dialog_rules=dialog_rules,
+                  top_characters=top_characters)
+
+    if workers == 1 or len(inputs) <= 1:
+        reports = [job(json_file) for json_file in inputs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # Lotes de varios archivos por tarea para repartir miles de archivos pequeños
+            n_workers = workers or os.cpu_count() or 1
+            chunksize = max(1, len(inputs) // (n_workers * 4))
+            reports = list(executor.map(job, inputs, chunksize=chunksize))
+
+    return reports, aggregate_reports(reports)
+
+
+def job_parameters(fps, rules, options=None):
+    """
+    Returns the fps and rules of one job: the batch values overridden by the
+    job's own (from a job-spec file).
+    """
+    options = options or {}
+    return options.get("fps", fps), resolve_rules({**(rules or {}), **options.get("rules", {})})
+
+
+def scheduled_job(json_file, kwargs, options=None):
+    """
+    Wraps the arguments of one job with its cost estimate and priority for run_jobs.
+    """
+    job = estimate_job(json_file)
+    job["priority"] = (options or {}).get("priority", 0)
+    job["kwargs"] = kwargs
+    return job
+
+
+def convert_job(json_file, output_file, fps=25, rules=None, journal_path=None, key=None,
+                input_hash=None, known_output=None, input_options=None, validate=False,
+                dialog_rules=None, top_characters=None):
+    """
+    Converts one file of a batch, recording its progress in the journal.
+
+    The SRT is only written when its content differs from the existing file.
+    Errors are returned in the result instead of being raised.
+
+    Returns:
+        dict: Manifest entry (input/output hashes, parameters, timing and status)
+    """
+    journal = BatchJournal(journal_path) if journal_path else None
+    if journal:
+        journal.record(key, STARTED, input=json_file, output=output_file)
+
+    start = time.perf_counter()
+    result = {"input": json_file, "output": output_file, "key": key,
+              "params": {"fps": fps, "rules": rules}}
+    try:
+        result["input_hash"] = input_hash or file_hash(json_file)
+        final_subs, top_characters = convert_file(json_file, fps, rules, input_options=input_options,
+                                                  validate=validate, dialog_rules=dialog_rules,
+                                                  top_characters=top_characters)
+        srt_text = render_srt(final_subs, top_characters)
+        written, output_hash = write_if_changed(output_file, srt_text, known_output)
+        result.update(status="written" if written else "unchanged",
+                      output_hash=output_hash, output_size=os.path.getsize(output_file))
+        if journal:
+            journal.record(key, DONE, input=json_file, output=output_file)
+    except Exception as e:
+        logger.error(f"Error converting {json_file}: {e}")
+        result.update(status="failed", error=str(e))
+        if journal:
+            journal.record(key, FAILED, input=json_file, output=output_file, error=str(e))
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def skipped_entry(kwargs, previous=None):
+    """
+    Manifest entry of a job skipped on resume.
+
+    The output hash comes from the previous manifest when it recorded the
+    same job and the file still has the recorded size; otherwise the output
+    on disk is hashed.
+    """
+    output_file = kwargs["output_file"]
+    entry = {"input": kwargs["json_file"], "output": output_file, "key": kwargs["key"],
+             "params": {"fps": kwargs["fps"], "rules": kwargs["rules"]},
+             "input_hash": kwargs["input_hash"], "status": "skipped"}
+    size = os.path.getsize(output_file)
+    if previous and previous.get("key") == kwargs["key"] and previous.get("output_size") == size:
+        output_hash = previous.get("output_hash")
+    else:
+        output_hash = file_hash(output_file)
+    entry.update(output_hash=output_hash, output_size=size, elapsed_ms=0.0)
+    return entry
+
+
+def render_job(json_file, output_name, fps=25, rules=None, input_options=None, validate=False,
+               dialog_rules=None, top_characters=None):
+    """
+    Converts one file of a batch in memory for archive output.
+
+    Returns:
+        dict: Manifest entry plus the rendered bytes under "content"
+    """
+    start = time.perf_counter()
+    result = {"input": json_file, "output": output_name, "params": {"fps": fps, "rules": rules}}
+    try:
+        result["input_hash"] = file_hash(json_file)
+        final_subs, top_characters = convert_file(json_file, fps, rules, input_options=input_options,
+                                                  validate=validate, dialog_rules=dialog_rules,
+                                                  top_characters=top_characters)
+        content = encode_text(render_srt(final_subs, top_characters))
+        result.update(status="written", content=content,
+                      output_hash=hash_bytes(content), output_size=len(content))
+    except Exception as e:
+        logger.error(f"Error converting {json_file}: {e}")
+        result.update(status="failed", error=str(e))
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def archive_names(inputs):
+    """
+    Maps each input to its name inside an archive: the .srt name, relative to
+    the folder that contains all the inputs.
+
+    Raises:
+        ValueError: If two inputs map to the same name (e.g. ep02.json and
+            ep02.csv), before anything is converted or written
+    """
+    if not inputs:
+        return {}
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in inputs])
+    names = {path: os.path.relpath(os.path.abspath(output_path_for(path)), base) for path in inputs}
+
+    sources = {}
+    for path, name in names.items():
+        sources.setdefault(name.replace("\\", "/"), []).append(path)
+    duplicates = [f"{name} ({', '.join(paths)})" for name, paths in sources.items() if len(paths) > 1]
+    if duplicates:
+        raise ValueError(f"Inputs with the same name in the archive: {'; '.join(duplicates)}")
+    return names
+
+
+def run_archive_batch(inputs, archive_path, fps=25, rules=None, workers=None, compression_level=None,
+                      input_options=None, job_options=None, memory_budget=None, validate=False,
+                      dialog_rules=None, index_path=None, series=None, series_root=None):
+    """
+    Converts many files and streams the SRTs into one zip or tar archive.
+
+    Workers only render; the parent process is the single archive writer and
+    adds each file as soon as it is ready, so no intermediate SRT touches the disk.
+    Jobs are scheduled, and the series index used, as in run_batch.
+
+    Returns:
+        list: Manifest entries (without content), in completion order
+    """
+    rules = resolve_rules(rules)
+    resolve_dialog_rules(dialog_rules)
+    names = archive_names(inputs)
+    top_characters = index_series(inputs, index_path, series, input_options, series_root) if index_path else None
+    job_options = job_options or {}
+    jobs = []
+    for json_file in inputs:
+        options = job_options.get(os.path.abspath(json_file))
+        job_fps, job_rules = job_parameters(fps, rules, options)
+        jobs.append(scheduled_job(json_file, {"json_file": json_file, "output_name": names[json_file],
+                                              "fps": job_fps, "rules": job_rules,
+                                              "input_options": input_options, "validate": validate,
+                                              "dialog_rules": dialog_rules,
+                                              "top_characters": top_characters}, options))
+    results = []
+
+    with ArchiveWriter(archive_path, compression_level) as archive:
+        for _, result in run_jobs(render_job, jobs, workers, memory_budget):
+            content = result.pop("content", None)
+            if content is not None:
+                archive.add(result["output"], content)
+            results.append(result)
+
+    return results
+
+
+def run_batch(inputs, output_dir=None, fps=25, rules=None, workers=None,
+              journal_path=None, resume=False, manifest_path=None, input_options=None,
+              job_options=None, memory_budget=None, validate=False, dialog_rules=None,
+              index_path=None, series=None, series_root=None):
+    """
+    Converts many files in parallel, optionally with a crash-safe journal.
+
+    Jobs run by priority and then largest first (estimated from file size
+    and item count), admitted against the memory budget (see utils.scheduler).
+
+    Args:
+        inputs (list): Input JSON files
+        output_dir (str): Output folder (next to each input by default)
+        fps (int): Frames per second of the timecodes
+        rules (dict): Subtitle rules overriding DEFAULT_RULES
+        workers (int): Worker processes (None = one per core, 1 = no pool)
+        journal_path (str): Journal file; each job is keyed by input hash and parameters
+        resume (bool): Skip the jobs the journal records as done
+        manifest_path (str): Run manifest to write. The hashes of a previous
+            manifest at the same path let unchanged outputs be skipped
+            without reading them back. Jobs skipped on resume keep an entry
+            with status "skipped".
+        input_options (dict): Options for CSV/TSV inputs (see utils.input_adapters)
+        job_options (dict): Absolute input path -> its own "fps", "rules",
+            "output" and "priority" (see utils.scheduler.load_job_spec)
+        memory_budget (int): Estimated bytes available to running jobs (None = no limit)
+        validate (bool): Validate each input first; an invalid file fails its
+            job with the location of the first error (see utils.validation)
+        dialog_rules (dict): Dialog normalization rules (see utils.dialog_normalizer)
+        index_path (str): Series character index (SQLite). Every input is
+            added to it before converting, and all the SRTs take their
+            colors from the ranking of the whole series.
+        series (str): Series name in the index
+        series_root (str): Folder the episode keys are relative to (see
+            utils.character_index.episode_name)
+
+    Returns:
+        tuple: (list of results of the jobs that ran, in input order, list of skipped input files)
+    """
+    rules = resolve_rules(rules)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    params = {"fps": fps, "rules": rules}
+    if input_options:
+        params["input_options"] = input_options
+    if dialog_rules:
+        params["dialog_rules"] = resolve_dialog_rules(dialog_rules)
+    top_characters = None
+    if index_path:
+        # Los colores dependen del ranking de la serie: forma parte de la clave de cada trabajo
+        top_characters = params["top_characters"] = index_series(inputs, index_path, series, input_options,
+                                                                 series_root)
+    previous = RunManifest.previous_entries(manifest_path) if manifest_path else {}
+
+    job_options = job_options or {}
+    jobs = []
+    for json_file in inputs:
+        options = job_options.get(os.path.abspath(json_file)) or {}
+        job_fps, job_rules = job_parameters(fps, rules, options)
+        output_file = options.get("output") or output_path_for(json_file, output_dir)
+        if os.path.dirname(output_file):
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
+        input_hash = key = None
+        if journal_path:
+            job_params = dict(params, fps=job_fps, rules=job_rules)
+            try:
+                input_hash = file_hash(json_file)
+            except OSError:
+                # El error se informa al convertir, como un trabajo fallido
+                input_hash = None
+            key = job_key(json_file, job_params, input_hash)
+        jobs.append(scheduled_job(json_file, {
+            "json_file": json_file, "output_file": output_file, "fps": job_fps, "rules": job_rules,
+            "journal_path": journal_path, "key": key, "input_hash": input_hash,
+            "known_output": RunManifest.known_output(previous.get(output_file)), "input_options": input_options,
+            "validate": validate, "dialog_rules": dialog_rules, "top_characters": top_characters
+        }, options))
+
+    skipped = []
+    entries = [None] * len(jobs)   # Entradas del manifiesto, en el orden de las entradas
+    pending = list(range(len(jobs)))
+    if resume and journal_path:
+        completed = BatchJournal(journal_path).completed()
+        pending = []
+        for i, job in enumerate(jobs):
+            kwargs = job["kwargs"]
+            if kwargs["key"] in completed and os.path.exists(kwargs["output_file"]):
+                skipped.append(kwargs["json_file"])
+                # Los trabajos saltados conservan su entrada en el manifiesto
+                entries[i] = skipped_entry(kwargs, previous.get(kwargs["output_file"]))
+            else:
+                pending.append(i)
+        logger.info(f"Resuming batch: {len(skipped)} done, {len(pending)} pending")
+
+    results = [None] * len(pending)
+    for i, result in run_jobs(convert_job, [jobs[j] for j in pending], workers, memory_budget):
+        results[i] = result
+        entries[pending[i]] = result
+
+    if manifest_path:
+        manifest = RunManifest(params)
+        for entry in entries:
+            manifest.add(entry)
+        manifest.save(manifest_path)
+
+    return results, skipped
@@ -0,0 +1,600 @@
+"""
+Command-line entry point for batch operations of the JSON to SRT converter.
+"""
+import os
+import sys
+import json
+import logging
+import socket
+import argparse
+
+import differential
+import live
+import sweep
+from batch import collect_inputs, run_qc_batch, run_batch, run_archive_batch
+from converter import resolve_rules, load_subtitles, merge_with_rules, render_retimed
+from utils.retime import speed_factor, parse_rate
+from utils.output_writer import write_if_changed
+from utils.output_writer import RunManifest
+from utils.qc import QC_RULES
+from utils.character_index import CharacterIndex
+from utils.scheduler import load_job_spec, parse_size
+from utils.validation import validate_file, format_issue, ValidationError
+
+logger = logging.getLogger(__name__)
+
+
+def parse_rule(text):
+    """Parses a KEY=VALUE rule override given on the command line."""
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got '{text}'")
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid value for rule '{key}': {value}")
+    return key.strip(), int(number) if number.is_integer() else number
+
+
+def parse_grid(text):
+    """Parses a KEY=V1,V2,... grid entry given on the command line."""
+    key, sep, values = text.partition("=")
+    if not sep or not values:
+        raise argparse.ArgumentTypeError(f"Expected KEY=V1,V2,..., got '{text}'")
+    return key.strip(), [parse_rule(f"{key}={value}")[1] for value in values.split(",")]
+
+
+def add_common_arguments(parser):
+    """Adds the options shared by every subcommand."""
+    parser.add_argument("--fps", type=int, default=25, help="Frames por segundo de los timecodes (25 por defecto)")
+    parser.add_argument("--rule", type=parse_rule, action="append", default=[], metavar="KEY=VALUE",
+                        help="Sobrescribe una regla de subtitulado (p. ej. --rule min_gap=40)")
+    parser.add_argument("--verbose", action="store_true", help="Muestra el log detallado de cada archivo")
+
+
+def parse_column(text):
+    """Parses a STANDARD=HEADER column mapping given on the command line."""
+    standard, sep, header = text.partition("=")
+    if not sep or not header:
+        raise argparse.ArgumentTypeError(f"Expected COLUMN=HEADER, got '{text}'")
+    return standard.strip().upper(), header
+
+
+def add_input_arguments(parser):
+    """Adds the options for CSV/TSV inputs."""
+    parser.add_argument("--column", type=parse_column, action="append", default=[], metavar="COLUMNA=CABECERA",
+                        help="Cabecera del CSV/TSV para IN, OUT, PERSONAJE o DIÁLOGO (p. ej. --column IN=Entrada)")
+    parser.add_argument("--delimiter", help="Separador del CSV/TSV (se detecta por defecto)")
+    parser.add_argument("--encoding", help="Codificación del CSV/TSV (se detecta por el BOM por defecto)")
+
+
+def input_options_from(args):
+    """Builds the input_options dict for CSV/TSV inputs from the parsed arguments."""
+    options = {}
+    if args.column:
+        options["column_map"] = dict(args.column)
+    if args.delimiter:
+        options["delimiter"] = "\t" if args.delimiter in ("\\t", "tab") else args.delimiter
+    if args.encoding:
+        options["encoding"] = args.encoding
+    return options or None
+
+
+def parse_dialog_rule(text):
+    """Parses a KEY=VALUE dialog normalization rule given on the command line."""
+    key, sep, value = text.partition("=")
+    if not sep:
+        raise argparse.ArgumentTypeError(f"Expected KEY=VALUE, got '{text}'")
+    lowered = value.strip().lower()
+    if lowered in ("true", "yes", "1"):
+        value = True
+    elif lowered in ("false", "no", "0"):
+        value = False
+    elif lowered in ("none", ""):
+        value = None
+    else:
+        value = lowered
+    return key.strip(), value
+
+
+def add_dialog_arguments(parser):
+    """Adds the dialog normalization options."""
+    parser.add_argument("--dialog", type=parse_dialog_rule, action="append", default=[], metavar="KEY=VALUE",
+                        help="Regla de normalización del diálogo: collapse_whitespace=true, "
+                             "ellipsis=unicode|ascii, quotes=straight")
+
+
+def dialog_rules_from(args):
+    """Builds the dialog_rules dict from the parsed arguments."""
+    return dict(args.dialog) or None
+
+
+def add_index_arguments(parser):
+    """Adds the series character index options."""
+    parser.add_argument("--index", help="Índice de personajes (SQLite) de la serie; los colores siguen su ranking")
+    parser.add_argument("--series", help="Serie en el índice de personajes")
+    parser.add_argument("--series-root", metavar="CARPETA",
+                        help="Carpeta de la serie: la clave de cada episodio es su ruta relativa a ella "
+                             "(p. ej. temporada1/ep01); solo el nombre del archivo por defecto")
+
+
+def series_index_from(args):
+    """
+    Returns the (index path, series) pair of the parsed arguments.
+
+    Raises:
+        ValueError: If only one of --index and --series is given
+    """
+    if bool(args.index) != bool(args.series):
+        raise ValueError("--index and --series must be given together")
+    return args.index, args.series
+
+
+def add_batch_arguments(parser, inputs_required=True):
+    """Adds the options shared by the subcommands that work over many files."""
+    parser.add_argument("inputs", nargs="+" if inputs_required else "*",
+                        help="Archivos JSON/CSV/TSV o carpetas que los contienen")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (uno por núcleo por defecto)")
+    add_input_arguments(parser)
+
+
+def print_qc_summary(reports, summary):
+    """Prints a one-line summary per file followed by the aggregate report."""
+    for report in reports:
+        if "error" in report:
+            print(f"ERROR  {report['file']}: {report['error']}")
+            continue
+        counts = ", ".join(f"{rule}={report['violations'][rule]}" for rule in QC_RULES)
+        status = "FAIL" if any(report["violations"].values()) else "OK"
+        print(f"{status:<6} {report['file']}: {report['subtitles']} subtitles, {counts}")
+
+    counts = ", ".join(f"{rule}={summary['violations'][rule]}" for rule in QC_RULES)
+    print(f"\n{summary['files']} files ({summary['failed']} failed, "
+          f"{summary['files_with_violations']} with violations), "
+          f"{summary['subtitles']} subtitles: {counts}")
+
+
+def cmd_qc(args):
+    """Runs the QC report over a set of files."""
+    inputs = collect_inputs(args.inputs)
+    index_path, series = series_index_from(args)
+    reports, summary = run_qc_batch(
+        inputs, fps=args.fps, rules=dict(args.rule), workers=args.workers,
+        output_dir=args.output_dir, check_only=not args.write, input_options=input_options_from(args),
+        validate=args.validate, dialog_rules=dialog_rules_from(args), index_path=index_path, series=series,
+        series_root=args.series_root
+    )
+    print_qc_summary(reports, summary)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"files": reports, "summary": summary}, f, ensure_ascii=False, indent=2)
+
+    if summary["failed"] or (args.strict and summary["files_with_violations"]):
+        return 1
+    return 0
+
+
+def cmd_diff(args):
+    """Compares a backend with the frozen reference engine."""
+    backend = differential.load_backend(args.backend) if args.backend else differential.live_convert
+    reports = differential.run_properties(cases=args.cases, seed=args.seed, backend=backend)
+    if args.corpus:
+        reports["corpus"] = differential.run_corpus(
+            collect_inputs(args.corpus, (".json",)), backend=backend, fps=args.fps, rules=dict(args.rule)
+        )
+
+    failed = False
+    for name, report in reports.items():
+        summary = report.summary()
+        status = "FAIL" if summary["mismatches"] else "OK"
+        failed = failed or bool(summary["mismatches"])
+        print(f"{status:<6} {name}: {summary['cases']} cases, {summary['mismatches']} mismatches, "
+              f"reference {summary['reference_seconds']}s, backend {summary['backend_seconds']}s, "
+              f"speedup x{summary['speedup']}")
+
+    if failed and args.dump_dir:
+        for path in differential.dump_mismatches(reports, args.dump_dir):
+            print(f"Mismatch saved: {path}")
+    if args.record:
+        differential.record_run(args.record, reports, args.backend or "live")
+
+    return 1 if failed else 0
+
+
+def cmd_sweep(args):
+    """Evaluates a grid of subtitle rules over one input file."""
+    results, subtitles, top_characters = sweep.sweep_file(
+        args.input, dict(args.grid), fps=args.fps, base_rules=dict(args.rule), workers=args.workers,
+        input_options=input_options_from(args), dialog_rules=dialog_rules_from(args)
+    )
+    best = sweep.best_result(results)
+    grid_keys = [key for key, _ in args.grid]
+
+    for i, result in enumerate(results):
+        params = ", ".join(f"{key}={result['rules'][key]}" for key in grid_keys)
+        marker = "*" if i == best else " "
+        print(f"{marker}{i:>4}  {params}: {result['subtitles']} subtitles, "
+              f"merge ratio {result['merge_ratio']:.2%}, {result['total_violations']} violations "
+              f"({', '.join(f'{rule}={count}' for rule, count in result['violations'].items())})")
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"input": args.input, "best": best, "results": results}, f, ensure_ascii=False, indent=2)
+
+    if args.output:
+        selected = best if args.select is None else args.select
+        if not 0 <= selected < len(results):
+            raise ValueError(f"--select must be between 0 and {len(results) - 1}")
+        written = sweep.write_sweep_srt(args.output, subtitles, top_characters, results[selected]["rules"],
+                                        dialog_rules_from(args))
+        print(f"SRT for set {selected} {'written to' if written else 'unchanged:'} {args.output}")
+    return 0
+
+
+DEFAULT_JOURNAL = "json2srt_journal.jsonl"
+
+
+def memory_size(text):
+    """Parses a memory size (512M, 4G...) given on the command line."""
+    try:
+        return parse_size(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def batch_jobs(args):
+    """
+    Collects the inputs of a batch and the per-job options of the job-spec file.
+
+    A file given both on the command line and in the job-spec file is one
+    job: paths are compared by their absolute form.
+
+    Returns:
+        tuple: (input files, absolute input path -> job options)
+    """
+    specs = load_job_spec(args.jobs) if args.jobs else []
+    if not args.inputs and not specs:
+        raise ValueError("No inputs: give files or folders, or a --jobs file")
+    job_options = {os.path.abspath(spec["input"]): spec for spec in specs}
+    inputs = collect_inputs(args.inputs) if args.inputs else []
+    listed = {os.path.abspath(path) for path in inputs}
+    inputs += [spec["input"] for path, spec in job_options.items() if path not in listed]
+    return inputs, job_options
+
+
+def cmd_batch_archive(args, inputs, job_options):
+    """Converts a set of files straight into one archive."""
+    if args.resume or args.journal or args.output_dir:
+        raise ValueError("--archive cannot be combined with --output-dir, --journal or --resume")
+
+    index_path, series = series_index_from(args)
+    results = run_archive_batch(inputs, args.archive, fps=args.fps, rules=dict(args.rule),
+                                workers=args.workers, compression_level=args.compression_level,
+                                input_options=input_options_from(args), job_options=job_options,
+                                memory_budget=args.memory_budget, validate=args.validate,
+                                dialog_rules=dialog_rules_from(args), index_path=index_path, series=series,
+                                series_root=args.series_root)
+    if args.manifest:
+        manifest = RunManifest({"fps": args.fps, "rules": resolve_rules(dict(args.rule)), "archive": args.archive})
+        for result in results:
+            manifest.add(result)
+        manifest.save(args.manifest)
+
+    failed = [result for result in results if result["status"] == "failed"]
+    for result in failed:
+        print(f"ERROR  {result['input']}: {result['error']}")
+    print(f"{len(results) - len(failed)} added to {args.archive}, {len(failed)} failed")
+    return 1 if failed else 0
+
+
+def cmd_batch(args):
+    """Converts a set of files, optionally resuming an interrupted batch."""
+    inputs, job_options = batch_jobs(args)
+    if args.archive:
+        return cmd_batch_archive(args, inputs, job_options)
+
+    # El diario se lleva siempre (salvo --no-journal), para poder reanudar cualquier lote interrumpido
+    if args.no_journal:
+        if args.resume or args.journal:
+            raise ValueError("--no-journal cannot be combined with --journal or --resume")
+        journal_path = None
+    else:
+        journal_path = args.journal or os.path.join(args.output_dir or ".", DEFAULT_JOURNAL)
+
+    index_path, series = series_index_from(args)
+    results, skipped = run_batch(
+        inputs, output_dir=args.output_dir, fps=args.fps, rules=dict(args.rule),
+        workers=args.workers, journal_path=journal_path, resume=args.resume,
+        manifest_path=args.manifest, input_options=input_options_from(args),
+        job_options=job_options, memory_budget=args.memory_budget, validate=args.validate,
+        dialog_rules=dialog_rules_from(args), index_path=index_path, series=series,
+        series_root=args.series_root
+    )
+
+    failed = [result for result in results if result["status"] == "failed"]
+    unchanged = [result for result in results if result["status"] == "unchanged"]
+    for result in failed:
+        print(f"ERROR  {result['input']}: {result['error']}")
+    print(f"{len(results) - len(failed) - len(unchanged)} written, {len(unchanged)} unchanged, "
+          f"{len(failed)} failed, {len(skipped)} skipped (already done)")
+    return 1 if failed else 0
+
+
+def cmd_validate(args):
+    """Validates input files (structure, fields, timecodes, ordering) without converting them."""
+    reports = []
+    input_options = input_options_from(args)
+    for path in collect_inputs(args.inputs):
+        try:
+            report = validate_file(path, args.fps, fail_fast=args.fail_fast, strict=args.strict,
+                                   input_options=input_options)
+        except ValidationError as e:
+            report = {"file": path, "items": None, "errors": 1, "warnings": 0, "issues": e.issues}
+        except (OSError, ValueError) as e:
+            report = {"file": path, "items": None, "errors": 1, "warnings": 0,
+                      "issues": [{"severity": "error", "code": "read", "message": str(e), "item": None}]}
+        reports.append(report)
+
+        status = "FAIL" if report["errors"] else "OK"
+        items = "" if report["items"] is None else f"{report['items']} items, "
+        print(f"{status:<6} {path}: {items}{report['errors']} errors, {report['warnings']} warnings")
+        shown = report["issues"][:args.max_issues]
+        for issue in shown:
+            print(f"       {issue['severity']}: {format_issue(issue)}")
+        if len(shown) < len(report["issues"]):
+            print(f"       ... {len(report['issues']) - len(shown)} more")
+        if args.fail_fast and report["errors"]:
+            break
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"files": reports}, f, ensure_ascii=False, indent=2)
+    return 1 if any(report["errors"] for report in reports) else 0
+
+
+def cmd_index(args):
+    """Adds, refreshes or removes episodes in the character index of a series."""
+    failed = 0
+    with CharacterIndex(args.index, args.series_root) as index:
+        for episode in args.remove or []:
+            index.remove_episode(args.series, episode)
+            print(f"removed: {episode}")
+        input_options = input_options_from(args)
+        keys = index.episode_keys(collect_inputs(args.inputs))
+        for path, episode in keys.items():
+            try:
+                changed = index.index_file(args.series, path, input_options=input_options)
+                print(f"{'indexed' if changed else 'unchanged'}: {path} (episode {episode})")
+            except Exception as e:
+                failed += 1
+                print(f"ERROR  {path}: {e}")
+        if args.list:
+            for episode in index.episodes(args.series):
+                print(f"episode: {episode}")
+        top_characters = index.get_top_characters(args.series)
+    print(f"Main characters of {args.series}: {', '.join(top_characters) or '(none)'}")
+    return 1 if failed else 0
+
+
+def retime_label(target, offset_ms):
+    """Builds the file name suffix of a retimed variant."""
+    parts = []
+    if target:
+        parts.append(f"{target.replace('/', '-')}fps")
+    if offset_ms:
+        parts.append(f"{offset_ms:+d}ms")
+    return "_".join(parts) or "retimed"
+
+
+def cmd_retime(args):
+    """Writes speed-changed and/or offset variants of one file from a single parse."""
+    rules = resolve_rules(dict(args.rule))
+    source = args.source_rate or str(args.fps)
+    parse_rate(source)
+    targets = args.to or [None]
+    for target in targets:
+        if target:
+            parse_rate(target)
+    offsets = args.offset_ms or [0]
+
+    subtitles, top_characters = load_subtitles(args.input, args.fps, input_options=input_options_from(args),
+                                               dialog_rules=dialog_rules_from(args))
+    merged_subs = merge_with_rules(subtitles, rules, dialog_rules_from(args))
+
+    output_dir = args.output_dir or os.path.dirname(args.input)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(args.input))[0]
+
+    failed = 0
+    for target in targets:
+        factor = speed_factor(source, target) if target else 1
+        for offset_ms in offsets:
+            output_file = os.path.join(output_dir, f"{base}_{retime_label(target, offset_ms)}.srt")
+            try:
+                srt_text = render_retimed(merged_subs, top_characters, factor, offset_ms, rules)
+            except ValueError as e:
+                # p. ej. un offset negativo que deja todos los subtítulos antes de 0
+                failed += 1
+                print(f"ERROR  {output_file} (factor {factor}, offset {offset_ms} ms): {e}")
+                continue
+            written, _ = write_if_changed(output_file, srt_text)
+            print(f"{'written' if written else 'unchanged'}: {output_file} (factor {factor}, offset {offset_ms} ms)")
+    return 1 if failed else 0
+
+
+def parse_address(text):
+    """Parses a HOST:PORT address given on the command line."""
+    host, sep, port = text.rpartition(":")
+    if not sep or not port.isdigit():
+        raise argparse.ArgumentTypeError(f"Expected HOST:PORT, got '{text}'")
+    return host or "127.0.0.1", int(port)
+
+
+def live_top_characters(args):
+    """Main characters for the live colors: given explicitly or from the series index."""
+    if args.top_characters:
+        return args.top_characters
+    index_path, series = series_index_from(args)
+    if index_path:
+        with CharacterIndex(index_path) as index:
+            return index.get_top_characters(series)
+    return []
+
+
+def cmd_live(args):
+    """Converts NDJSON items from stdin (or one TCP connection) as they arrive."""
+    rules = resolve_rules(dict(args.rule))
+    top_characters = live_top_characters(args)
+
+    if args.listen:
+        with socket.create_server(args.listen) as server:
+            print(f"Listening on {args.listen[0]}:{args.listen[1]}", file=sys.stderr)
+            connection, address = server.accept()
+            with connection, connection.makefile("r", encoding="utf-8") as lines:
+                logger.info(f"Connection from {address[0]}:{address[1]}")
+                subtitler = live.run_live(lines, sys.stdout, args.fps, rules, top_characters,
+                                          dialog_rules_from(args))
+    else:
+        subtitler = live.run_live(sys.stdin, sys.stdout, args.fps, rules, top_characters, dialog_rules_from(args))
+
+    stats = subtitler.stats()
+    print(f"{stats['emitted']} cues, {stats['skipped']} skipped; "
+          + "; ".join(f"{name} p50 {stats[name]['p50_ms']} ms, p95 {stats[name]['p95_ms']} ms, "
+                      f"max {stats[name]['max_ms']} ms" for name in ("processing", "hold")),
+          file=sys.stderr)
+    if args.stats:
+        with open(args.stats, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+    return 0
+
+
+def build_parser():
+    """Builds the argument parser with all subcommands."""
+    parser = argparse.ArgumentParser(prog="json2srt", description="Conversor JSON a SRT por línea de comandos")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    qc_parser = subparsers.add_parser("qc", help="Comprueba las reglas de entrega sin escribir los SRT")
+    add_batch_arguments(qc_parser)
+    add_common_arguments(qc_parser)
+    add_dialog_arguments(qc_parser)
+    qc_parser.add_argument("--report", help="Guarda el informe completo (por archivo y agregado) en JSON")
+    qc_parser.add_argument("--write", action="store_true", help="Escribe también los SRT")
+    qc_parser.add_argument("--output-dir", help="Carpeta de salida de los SRT (junto al JSON por defecto)")
+    qc_parser.add_argument("--strict", action="store_true", help="Devuelve error si algún archivo tiene incidencias")
+    qc_parser.add_argument("--validate", action="store_true", help="Valida cada archivo antes de convertirlo")
+    add_index_arguments(qc_parser)
+    qc_parser.set_defaults(func=cmd_qc)
+
+    diff_parser = subparsers.add_parser("diff", help="Compara el motor actual con la copia de referencia")
+    diff_parser.add_argument("corpus", nargs="*", help="Archivos JSON o carpetas a comparar además de los casos aleatorios")
+    add_common_arguments(diff_parser)
+    diff_parser.add_argument("--cases", type=int, default=200, help="Número de casos aleatorios (200 por defecto)")
+    diff_parser.add_argument("--seed", type=int, default=0, help="Semilla de los casos aleatorios")
+    diff_parser.add_argument("--backend", help="Backend a comparar como módulo:función (el conversor actual por defecto)")
+    diff_parser.add_argument("--dump-dir", help="Carpeta donde guardar las entradas que no coinciden")
+    diff_parser.add_argument("--record", help="Añade el resumen y la aceleración a un histórico JSON Lines")
+    diff_parser.set_defaults(func=cmd_diff)
+
+    batch_parser = subparsers.add_parser("batch", help="Convierte muchos archivos en paralelo")
+    add_batch_arguments(batch_parser, inputs_required=False)
+    add_common_arguments(batch_parser)
+    add_dialog_arguments(batch_parser)
+    batch_parser.add_argument("--jobs", help="Archivo de trabajos (JSON) con fps, reglas, salida y prioridad por archivo")
+    batch_parser.add_argument("--memory-budget", type=memory_size, metavar="TAMAÑO",
+                              help="Memoria estimada máxima de los trabajos en marcha (p. ej. 4G)")
+    batch_parser.add_argument("--validate", action="store_true",
+                              help="Valida cada archivo antes de convertirlo; un archivo inválido falla sin convertirse")
+    batch_parser.add_argument("--output-dir", help="Carpeta de salida de los SRT (junto al JSON por defecto)")
+    batch_parser.add_argument("--journal",
+                              help=f"Diario de trabajos (JSON Lines) para poder reanudar el lote "
+                                   f"({DEFAULT_JOURNAL} en la carpeta de salida por defecto)")
+    batch_parser.add_argument("--no-journal", action="store_true", help="No lleva diario (el lote no se podrá reanudar)")
+    batch_parser.add_argument("--resume", action="store_true", help="Salta los archivos ya convertidos según el diario")
+    batch_parser.add_argument("--manifest", help="Manifiesto de la ejecución (hashes, parámetros y tiempos) en JSON")
+    batch_parser.add_argument("--archive", help="Escribe todos los SRT en un único .zip o .tar(.gz/.bz2/.xz)")
+    batch_parser.add_argument("--compression-level", type=int, choices=range(10), metavar="0-9",
+                              help="Nivel de compresión del archivo comprimido (.tar.bz2: 1-9)")
+    add_index_arguments(batch_parser)
+    batch_parser.set_defaults(func=cmd_batch)
+
+    validate_parser = subparsers.add_parser("validate", help="Valida la estructura, campos, timecodes y orden de los archivos")
+    validate_parser.add_argument("inputs", nargs="+", help="Archivos JSON/CSV/TSV o carpetas que los contienen")
+    add_input_arguments(validate_parser)
+    validate_parser.add_argument("--fps", type=int, default=25, help="Frames por segundo de los timecodes (25 por defecto)")
+    validate_parser.add_argument("--verbose", action="store_true", help="Muestra el log detallado")
+    validate_parser.add_argument("--fail-fast", action="store_true", help="Se detiene en el primer error")
+    validate_parser.add_argument("--strict", action="store_true", help="Trata los avisos (orden de los tiempos) como errores")
+    validate_parser.add_argument("--max-issues", type=int, default=20,
+                                 help="Incidencias mostradas por archivo (20 por defecto; el informe las incluye todas)")
+    validate_parser.add_argument("--report", help="Guarda todas las incidencias en JSON")
+    validate_parser.set_defaults(func=cmd_validate)
+
+    index_parser = subparsers.add_parser("index", help="Añade o actualiza episodios en el índice de personajes de una serie")
+    index_parser.add_argument("inputs", nargs="*", help="Archivos JSON/CSV/TSV o carpetas que los contienen")
+    add_input_arguments(index_parser)
+    index_parser.add_argument("--index", required=True, help="Índice de personajes (SQLite); se crea si no existe")
+    index_parser.add_argument("--series", required=True, help="Serie en el índice de personajes")
+    index_parser.add_argument("--series-root", metavar="CARPETA",
+                              help="Carpeta de la serie: la clave de cada episodio es su ruta relativa a ella "
+                                   "(p. ej. temporada1/ep01); solo el nombre del archivo por defecto")
+    index_parser.add_argument("--remove", action="append", metavar="EPISODIO",
+                              help="Quita un episodio por su clave, tal como la muestra --list; repetible")
+    index_parser.add_argument("--list", action="store_true", help="Muestra los episodios indexados de la serie")
+    index_parser.add_argument("--verbose", action="store_true", help="Muestra el log detallado")
+    index_parser.set_defaults(func=cmd_index)
+
+    retime_parser = subparsers.add_parser("retime", help="Genera versiones con cambio de velocidad u offset sin volver a convertir")
+    retime_parser.add_argument("input", help="Archivo JSON/CSV/TSV de entrada")
+    add_common_arguments(retime_parser)
+    add_dialog_arguments(retime_parser)
+    add_input_arguments(retime_parser)
+    retime_parser.add_argument("--from", dest="source_rate",
+                               help="Velocidad original del material (p. ej. 23.976; --fps por defecto)")
+    retime_parser.add_argument("--to", action="append", help="Velocidad de destino (p. ej. 25 o 24000/1001); repetible")
+    retime_parser.add_argument("--offset-ms", type=int, action="append", help="Desplazamiento en ms; repetible")
+    retime_parser.add_argument("--output-dir", help="Carpeta de salida (junto al JSON por defecto)")
+    retime_parser.set_defaults(func=cmd_retime)
+
+    sweep_parser = subparsers.add_parser("sweep", help="Evalúa una rejilla de reglas sobre un único archivo")
+    sweep_parser.add_argument("input", help="Archivo JSON/CSV/TSV de entrada")
+    add_common_arguments(sweep_parser)
+    add_dialog_arguments(sweep_parser)
+    add_input_arguments(sweep_parser)
+    sweep_parser.add_argument("--grid", type=parse_grid, action="append", required=True, metavar="KEY=V1,V2",
+                              help="Valores a probar para una regla (p. ej. --grid cps=15,17)")
+    sweep_parser.add_argument("--workers", type=int, default=None, help="Procesos en paralelo (uno por núcleo por defecto)")
+    sweep_parser.add_argument("--report", help="Guarda los resultados en JSON")
+    sweep_parser.add_argument("--output", help="Escribe el SRT del conjunto elegido")
+    sweep_parser.add_argument("--select", type=int, help="Conjunto a escribir con --output (el de menos incidencias por defecto)")
+    sweep_parser.set_defaults(func=cmd_sweep)
+
+    live_parser = subparsers.add_parser("live", help="Convierte elementos NDJSON en directo (stdin o socket) a SRT en stdout")
+    add_common_arguments(live_parser)
+    add_dialog_arguments(live_parser)
+    live_parser.add_argument("--listen", type=parse_address, metavar="HOST:PORT",
+                             help="Lee de una conexión TCP en lugar de stdin")
+    live_parser.add_argument("--top-characters", action="append", metavar="PERSONAJE",
+                             help="Personaje principal para los colores, en orden; repetible")
+    add_index_arguments(live_parser)
+    live_parser.add_argument("--stats", help="Guarda las estadísticas de latencia en JSON")
+    live_parser.set_defaults(func=cmd_live)
+
+    return parser
+
+
+def main(argv=None):
+    """Parses the command line and runs the selected subcommand."""
+    args = build_parser().parse_args(argv)
+    if not getattr(args, "verbose", False):
+        logging.getLogger().setLevel(logging.WARNING)
+    try:
+        return args.func(args)
+    except ValueError as e:
+        logger.error(str(e))
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,8 +3,15 @@
 import json
 import os
 import logging
+from collections import Counter
 
 from utils.character_utils import count_character_appearances, get_top_characters, assign_color_code
+from utils.character_index import file_fingerprint
+from utils.output_writer import write_if_changed
+from utils.retime import retime_subtitles
+from utils.input_adapters import iter_tabular_items, TABULAR_EXTENSIONS
+from utils.validation import validate_file
+from utils.dialog_normalizer import dialog_normalizer, merge_continuation
 from utils.time_utils import convert_time  # Convierte "hh:mm:ss:ff" a "hh:mm:ss,mmm"
 
 # Importar las funciones de subtitle_rules
@@ -22,6 +29,19 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Reglas de subtitulado por defecto (valores de entrega habituales)
+DEFAULT_RULES = {
+    "max_gap": 3000,   # Gap máx. entre subtítulos del mismo personaje para fusionar
+    "min_gap": 24,     # Separación mínima entre subtítulos
+    "min_dur": 1000,   # Duración mínima de un subtítulo (ms)
+    "max_dur": 8000,   # Duración máxima de un subtítulo (ms)
+    "max_chars": 37,   # Límite de caracteres de la PRIMERA línea
+    "cps": 15,         # Caracteres por segundo objetivo
+}
+
+# Normalizador de diálogo con las reglas por defecto (compilado una vez)
+_default_normalizer = dialog_normalizer()
+
 def load_json_file(json_path):
     """
     Carga y parsea un archivo JSON.
@@ -51,106 +71,256 @@ def extract_data_from_json(json_content):
 def create_srt_entry(index, start_time, end_time, color_code, dialog):
     """
     Crea la entrada SRT (texto) para un subtítulo.
+
+    El diálogo ya viene formateado por postprocess_subtitles (líneas limpias),
+    así que se usa tal cual.
     """
-    # Asegurarse de que el diálogo no tenga espacios extra al inicio/final de las líneas
-    cleaned_dialog = "\n".join(line.strip() for line in dialog.strip().split('\n'))
-    return f"{index}\n{start_time} --> {end_time}\n{color_code}{cleaned_dialog}\n"
+    return f"{index}\n{start_time} --> {end_time}\n{color_code}{dialog}\n"
 
-# --- FUNCIÓN MODIFICADA ---
-def process_json_to_srt(json_file, output_file, fps=25, callback=None):
+def resolve_rules(rules=None):
     """
-    Procesa un archivo JSON a SRT, aplicando fusión de subtítulos consecutivos,
-    ajuste de tiempos y formateo de texto según las nuevas reglas.
+    Combina las reglas indicadas con DEFAULT_RULES y rechaza claves desconocidas.
     """
-    try:
-        logger.info(f"Processing {json_file} to {output_file}")
+    resolved = dict(DEFAULT_RULES)
+    if rules:
+        unknown = set(rules) - set(DEFAULT_RULES)
+        if unknown:
+            raise ValueError(f"Unknown subtitle rules: {', '.join(sorted(unknown))}")
+        resolved.update(rules)
+    return resolved
+
+def normalize_item(item, fps=25, normalize=None):
+    """
+    Convierte UN elemento del JSON en un subtítulo con tiempos en ms y el
+    diálogo normalizado. Devuelve None si al elemento le falta IN, OUT o DIÁLOGO.
+
+    normalize es la función de utils.dialog_normalizer.dialog_normalizer
+    (las reglas por defecto si es None).
+    """
+    if "IN" not in item or "OUT" not in item or "DIÁLOGO" not in item:
+        return None
+
+    # Convertir "hh:mm:ss:ff" a "hh:mm:ss,mmm" (formato SRT)
+    start_srt = convert_time(item["IN"], fps)
+    end_srt = convert_time(item["OUT"], fps)
+
+    # Convertir a milisegundos
+    start_ms = srt_time_to_ms(start_srt)
+    end_ms = srt_time_to_ms(end_srt)
+
+    # Normalizar el diálogo una sola vez (por defecto: \n por espacio y quitar espacios extra);
+    # las etapas siguientes ya no lo vuelven a limpiar
+    dialog = (normalize or _default_normalizer)(item["DIÁLOGO"])
+
+    character = item.get("PERSONAJE", "")
+
+    return {
+        "start_ms": start_ms,
+        "end_ms": end_ms,
+        "dialog": dialog, # Dialogo normalizado
+        "character": character,
+    }
+
+def build_subtitles(data, fps=25, character_counter=None, normalize=None):
+    """
+    Convierte cada elemento del JSON en una estructura con tiempos en ms
+    y el diálogo normalizado (ver normalize_item).
+
+    data puede ser cualquier iterable de elementos (p. ej. un lector de CSV
+    fila a fila). Si se pasa un Counter, los personajes se cuentan en la misma
+    pasada, igual que count_character_appearances.
+    """
+    subtitles = []
+    for item in data:
+        if character_counter is not None and item.get("PERSONAJE"):
+            character_counter[item["PERSONAJE"]] += 1
+        subtitle = normalize_item(item, fps, normalize)
+        if subtitle is not None:
+            subtitles.append(subtitle)
+    return subtitles
+
+def merge_with_rules(subtitles, rules=None, dialog_rules=None):
+    """
+    Fusiona subtítulos consecutivos del mismo personaje según las reglas.
+
+    dialog_rules decide los puntos suspensivos que se añaden al unir frases
+    (ver utils.dialog_normalizer.merge_continuation).
+    """
+    rules = resolve_rules(rules)
+    return merge_subtitles(
+        subtitles,
+        max_gap=rules["max_gap"],
+        max_chars=rules["max_chars"],
+        max_sub_dur=rules["max_dur"],
+        continuation=merge_continuation(dialog_rules)
+    )
+
+def postprocess_with_rules(merged_subs, rules=None):
+    """
+    Ajusta espacios mínimos y duraciones y formatea el texto según las reglas.
+    """
+    rules = resolve_rules(rules)
+    return postprocess_subtitles(
+        merged_subs,
+        min_gap=rules["min_gap"],
+        min_dur=rules["min_dur"],
+        max_dur=rules["max_dur"],
+        max_chars=rules["max_chars"], # Este sigue siendo el límite para la PRIMERA línea
+        cps=rules["cps"]
+    )
+
+def apply_subtitle_rules(subtitles, rules=None, dialog_rules=None):
+    """
+    Fusiona subtítulos consecutivos y ajusta tiempos y formato según las reglas.
+    """
+    return postprocess_with_rules(merge_with_rules(subtitles, rules, dialog_rules), rules)
+
+def render_retimed(merged_subs, top_characters, factor=1, offset_ms=0, rules=None):
+    """
+    Aplica un factor de velocidad exacto y/o un offset en ms a subtítulos ya
+    fusionados y vuelve a aplicar SOLO las reglas de tiempos y formato
+    (postprocess), sin volver a leer ni fusionar el archivo.
+    """
+    retimed_subs = retime_subtitles(merged_subs, factor, offset_ms)
+    return render_srt(postprocess_with_rules(retimed_subs, rules), top_characters)
 
+def render_srt(final_subs, top_characters, callback=None):
+    """
+    Genera el contenido SRT final a partir de los subtítulos postprocesados.
+    """
+    srt_content = []
+    total_items = len(final_subs)
+
+    for i, sub in enumerate(final_subs, start=1):
+        new_start = ms_to_srt_time(sub["start_ms"])
+        new_end = ms_to_srt_time(sub["end_ms"])
+
+        # Asignar color code según el personaje
+        color_code = assign_color_code(sub["character"], top_characters)
+
+        # Crear la entrada SRT
+        srt_entry = create_srt_entry(i, new_start, new_end, color_code, sub["dialog"])
+        srt_content.append(srt_entry)
+
+        if callback and i % 5 == 0:
+            callback(i / total_items * 100)
+
+    if not srt_content:
+        raise ValueError("Could not generate SRT content from data")
+
+    return "\n".join(srt_content)
+
+def load_subtitles(json_file, fps=25, character_index=None, series=None, input_options=None,
+                   validate=False, dialog_rules=None, top_characters=None):
+    """
+    Carga un archivo JSON (o CSV/TSV) y devuelve los subtítulos normalizados
+    (tiempos en ms, diálogo preprocesado) junto con los personajes
+    principales, antes de aplicar las reglas de fusión y tiempos.
+
+    Los CSV/TSV se leen fila a fila con las opciones de input_options
+    (delimiter, column_map, encoding; ver utils.input_adapters).
+
+    Si se pasa un CharacterIndex y el nombre de la serie, el episodio se
+    actualiza en el índice y los colores se asignan con el ranking de toda la
+    serie, de modo que un personaje mantiene su color entre episodios.
+    Si se pasan top_characters (p. ej. el ranking de la serie calculado antes
+    de un lote), se usan tal cual.
+
+    Con validate=True el archivo se valida antes en una pasada rápida
+    (utils.validation) y el primer error se lanza como ValidationError, con
+    el índice del elemento y su posición en el archivo.
+
+    dialog_rules son las reglas de normalización del diálogo
+    (utils.dialog_normalizer); se compilan una vez para todo el archivo.
+    """
+    if validate:
+        validate_file(json_file, fps, fail_fast=True, input_options=input_options)
+    normalize = dialog_normalizer(dialog_rules)
+
+    if json_file.lower().endswith(TABULAR_EXTENSIONS):
+        # 1-3) Leer fila a fila, contando personajes en la misma pasada
+        character_counter = Counter()
+        subtitles = build_subtitles(
+            iter_tabular_items(json_file, **(input_options or {})), fps, character_counter, normalize
+        )
+        if not subtitles:
+            raise ValueError(f"No valid data found in {json_file}")
+    else:
         # 1) Cargar y extraer datos del JSON
         json_content = load_json_file(json_file)
         data = extract_data_from_json(json_content)
 
-        # 2) Contar personajes y obtener top_characters (para color codes)
+        # 2) Contar personajes (para color codes)
         character_counter = count_character_appearances(json_content)
-        top_characters = get_top_characters(character_counter)
 
-        logger.info("Top 4 characters with most lines:")
-        for i, character in enumerate(top_characters):
-            logger.info(f"{i+1}. {character}: {character_counter[character]} lines")
-
-        # 3) Convertir cada elemento en una estructura con tiempos en ms y PREPROCESAR DIÁLOGO
-        subtitles = []
-        for item in data:
-            if "IN" in item and "OUT" in item and "DIÁLOGO" in item:
-                # Convertir "hh:mm:ss:ff" a "hh:mm:ss,mmm" (formato SRT)
-                start_srt = convert_time(item["IN"], fps)
-                end_srt = convert_time(item["OUT"], fps)
-
-                # Convertir a milisegundos
-                start_ms = srt_time_to_ms(start_srt)
-                end_ms = srt_time_to_ms(end_srt)
-
-                # CAMBIO: Preprocesar diálogo: reemplazar \n por espacio y quitar espacios extra
-                dialog = item["DIÁLOGO"].replace('\n', ' ').strip()
-                # CAMBIO: Ya NO se llama a remove_parentheses_content
-
-                character = item.get("PERSONAJE", "")
-
-                subtitles.append({
-                    "start_ms": start_ms,
-                    "end_ms": end_ms,
-                    "dialog": dialog, # Dialogo preprocesado
-                    "character": character,
-                    # Guardar partes originales por si se necesita en la fusión (opcional pero puede ser útil)
-                    "original_dialog": item["DIÁLOGO"].strip()
-                })
-
-        # 4) Fusionar subtítulos consecutivos del mismo personaje (NUEVA REGLA DE GAP)
-        #    Pasamos el nuevo max_gap=3000 y quitamos max_length de aquí
-        merged_subs = merge_subtitles(subtitles, max_gap=3000) # max_length ya no se pasa aquí
-
-        # 5) Postprocesar: ajustar espacios mínimos, duraciones y formatear el texto (NUEVA LÓGICA)
-        final_subs = postprocess_subtitles(
-            merged_subs,
-            min_gap=24,
-            min_dur=1000,
-            max_dur=8000,
-            max_chars=37 # Este sigue siendo el límite para la PRIMERA línea
-        )
+        # 3) Convertir los elementos a subtítulos con tiempos en ms
+        subtitles = build_subtitles(data, fps, normalize=normalize)
 
-        # 6) Generar el contenido SRT final
-        srt_content = []
-        total_items = len(final_subs)
+    # Obtener top_characters del episodio o de la serie
+    if top_characters is not None:
+        top_characters = list(top_characters)
+    elif character_index is not None and series:
+        character_index.update_episode(series, character_index.episode_key(json_file), character_counter,
+                                       file_fingerprint(json_file), source=json_file)
+        character_counter = character_index.get_series_counter(series)
+        top_characters = character_index.get_top_characters(series)
+    else:
+        top_characters = get_top_characters(character_counter)
 
-        for i, sub in enumerate(final_subs, start=1):
-            new_start = ms_to_srt_time(sub["start_ms"])
-            new_end = ms_to_srt_time(sub["end_ms"])
+    logger.info("Top 4 characters with most lines:")
+    for i, character in enumerate(top_characters):
+        logger.info(f"{i+1}. {character}: {character_counter[character]} lines")
 
-            # Asignar color code según el personaje
-            color_code = assign_color_code(sub["character"], top_characters)
+    return subtitles, top_characters
+
+def convert_file(json_file, fps=25, rules=None, character_index=None, series=None,
+                 input_options=None, validate=False, dialog_rules=None, top_characters=None):
+    """
+    Carga un archivo JSON (o CSV/TSV) y devuelve los subtítulos finales junto
+    con los personajes principales, sin escribir nada en disco.
+    """
+    subtitles, top_characters = load_subtitles(
+        json_file, fps, character_index=character_index, series=series,
+        input_options=input_options, validate=validate, dialog_rules=dialog_rules,
+        top_characters=top_characters
+    )
+    # 4) Fusionar, ajustar tiempos y formatear
+    final_subs = apply_subtitle_rules(subtitles, rules, dialog_rules)
+    return final_subs, top_characters
 
-            # Crear la entrada SRT
-            # La función create_srt_entry se asegura de limpiar espacios finales
-            srt_entry = create_srt_entry(i, new_start, new_end, color_code, sub["dialog"])
-            srt_content.append(srt_entry)
+def process_json_to_srt(json_file, output_file, fps=25, callback=None,
+                        character_index=None, series=None, rules=None, input_options=None,
+                        validate=False, dialog_rules=None):
+    """
+    Procesa un archivo JSON a SRT, aplicando fusión de subtítulos consecutivos,
+    ajuste de tiempos y formateo de texto según las reglas (DEFAULT_RULES
+    salvo que se indiquen otras).
 
-            if callback and i % 5 == 0:
-                callback(i / total_items * 100)
+    Devuelve (final_subs, top_characters), p. ej. para mostrar el resultado
+    en la vista previa de la interfaz sin volver a convertir.
+    """
+    try:
+        logger.info(f"Processing {json_file} to {output_file}")
 
-        if not srt_content:
-            raise ValueError("Could not generate SRT content from data")
+        final_subs, top_characters = convert_file(
+            json_file, fps, rules,
+            character_index=character_index, series=series, input_options=input_options,
+            validate=validate, dialog_rules=dialog_rules
+        )
+        srt_text = render_srt(final_subs, top_characters, callback)
 
-        # 7) Guardar el archivo SRT
-        with open(output_file, 'w', encoding='utf-8') as f:
-            f.write("\n".join(srt_content))
+        # Guardar el archivo SRT (sin reescribirlo si el contenido no cambia)
+        written, _ = write_if_changed(output_file, srt_text)
 
         if callback:
             callback(100)
 
-        logger.info(f"SRT file created: {output_file}")
-        return True
+        if written:
+            logger.info(f"SRT file created: {output_file}")
+        else:
+            logger.info(f"SRT file unchanged, not rewritten: {output_file}")
+        return final_subs, top_characters
 
     except Exception as e:
         logger.error(f"Error processing file: {str(e)}")
         raise
-
-# --- FIN FUNCIÓN MODIFICADA ---
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""
+Differential harness: pins the conversion engine to the frozen reference.
+
+Random (property-based) and corpus inputs are converted with the reference
+engine (utils/reference_engine.py) and with a backend under test (by default
+the live converter stages). The SRT outputs must be byte-for-byte equal. The
+time spent in each engine is recorded so optimizations can report their speedup.
+"""
+import copy
+import json
+import os
+import random
+import time
+import importlib
+
+from converter import (
+    build_subtitles, apply_subtitle_rules, render_srt, resolve_rules,
+    load_json_file, extract_data_from_json, DEFAULT_RULES
+)
+from utils.character_utils import count_character_appearances, get_top_characters
+from utils.time_utils import convert_time
+from utils.subtitle_rules import format_dialog_simple_split, split_dialog
+from utils.dialog_normalizer import dialog_normalizer
+from utils import reference_engine
+
+CHARACTERS = ["ANA", "LUIS", "MARTA", "PEDRO", "JUAN", "", None]
+WORDS = [
+    "hola", "que", "tal", "sí", "no", "vale", "¿qué?", "¡venga!", "...", "…", "-", "'bien'",
+    "\"dijo\"", "esto", "es", "una", "prueba", "de", "subtítulos", "con", "texto", "largo",
+    "supercalifragilisticoespialidosoyalgomasquenocabe", "a,", "b.", "c;", "d:", "e!", "f?",
+]
+SEPARATORS = [" ", " ", " ", " ", "  ", "\n", " \n ", "\r\n", "\t"]
+
+
+def random_timecode(rng, ms, fps):
+    """Builds a valid "hh:mm:ss:ff" timecode close to a time in ms."""
+    ms = max(0, ms)
+    seconds = ms // 1000
+    frame = min(fps - 1, (ms % 1000) * fps // 1000)
+    return f"{seconds // 3600:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}:{frame:02d}"
+
+
+def random_dialog(rng):
+    """Builds a dialog mixing punctuation, odd spacing, line breaks and long words."""
+    if rng.random() < 0.03:
+        return rng.choice(["", " ", "\n", "   "])
+    parts = []
+    for _ in range(rng.randint(1, 22)):
+        parts.append(rng.choice(WORDS))
+        parts.append(rng.choice(SEPARATORS))
+    text = "".join(parts)
+    if rng.random() < 0.2:
+        text = " " + text
+    return text
+
+
+def random_items(rng, fps=25, max_items=60):
+    """
+    Generates a random list of JSON items.
+
+    Timings include overlaps, zero and negative durations and large gaps so
+    every branch of the merge and postprocess rules is exercised.
+    """
+    items = []
+    t = rng.randint(0, 5000)
+    for _ in range(rng.randint(0, max_items)):
+        t += rng.choice([-500, 0, 10, 40, 200, 1000, 2900, 3100, 6000])
+        duration = rng.choice([-200, 0, 40, 500, 1500, 4000, 7900, 9000])
+        item = {
+            "IN": random_timecode(rng, t, fps),
+            "OUT": random_timecode(rng, t + duration, fps),
+            "DIÁLOGO": random_dialog(rng),
+        }
+        character = rng.choice(CHARACTERS)
+        if character is not None:
+            item["PERSONAJE"] = character
+        if rng.random() < 0.02:
+            del item[rng.choice(["IN", "OUT", "DIÁLOGO"])]
+        items.append(item)
+        t = max(0, t + max(duration, 0))
+    return items
+
+
+def random_rules(rng):
+    """Returns DEFAULT_RULES, or a random variation of them."""
+    rules = dict(DEFAULT_RULES)
+    if rng.random() < 0.5:
+        rules.update(
+            max_gap=rng.choice([0, 500, 3000, 6000]),
+            min_gap=rng.choice([0, 24, 80]),
+            min_dur=rng.choice([500, 1000, 1500]),
+            max_dur=rng.choice([4000, 8000, 10000]),
+            max_chars=rng.choice([20, 37, 42]),
+            cps=rng.choice([0, 12, 15, 17]),
+        )
+    return rules
+
+
+def live_convert(data, fps=25, rules=None):
+    """Converts JSON items to SRT text with the live converter stages."""
+    top_characters = get_top_characters(count_character_appearances(data))
+    subtitles = build_subtitles(data, fps)
+    final_subs = apply_subtitle_rules(subtitles, rules)
+    return render_srt(final_subs, top_characters)
+
+
+def load_backend(spec):
+    """Imports a backend given as "module:function"."""
+    module_name, _, function_name = spec.partition(":")
+    return getattr(importlib.import_module(module_name), function_name or "convert")
+
+
+def _run(engine, data, fps, rules):
+    """Runs an engine and returns (outcome, seconds). Errors are part of the outcome."""
+    data = copy.deepcopy(data)
+    start = time.perf_counter()
+    try:
+        outcome = engine(data, fps, rules).encode("utf-8")
+    except Exception as e:
+        outcome = ("error", type(e).__name__, str(e))
+    return outcome, time.perf_counter() - start
+
+
+def _timed(function, *args):
+    start = time.perf_counter()
+    try:
+        result = function(*args)
+    except Exception as e:
+        result = ("error", type(e).__name__, str(e))
+    return result, time.perf_counter() - start
+
+
+class DifferentialReport:
+    """Accumulates mismatches and timings of a differential run."""
+
+    def __init__(self):
+        self.cases = 0
+        self.mismatches = []
+        self.reference_seconds = 0.0
+        self.backend_seconds = 0.0
+
+    def add(self, name, reference_outcome, backend_outcome, reference_seconds, backend_seconds, case):
+        self.cases += 1
+        self.reference_seconds += reference_seconds
+        self.backend_seconds += backend_seconds
+        if reference_outcome != backend_outcome:
+            self.mismatches.append({"name": name, "case": case,
+                                    "reference": reference_outcome, "backend": backend_outcome})
+
+    @property
+    def speedup(self):
+        if self.backend_seconds <= 0:
+            return float("inf")
+        return self.reference_seconds / self.backend_seconds
+
+    def summary(self):
+        return {
+            "cases": self.cases,
+            "mismatches": len(self.mismatches),
+            "reference_seconds": round(self.reference_seconds, 4),
+            "backend_seconds": round(self.backend_seconds, 4),
+            "speedup": round(self.speedup, 3),
+        }
+
+
+def compare_conversion(report, name, data, fps, rules, backend=live_convert):
+    """Converts one input with both engines and records the result."""
+    rules = resolve_rules(rules)
+    reference_outcome, reference_seconds = _run(reference_engine.reference_convert, data, fps, rules)
+    backend_outcome, backend_seconds = _run(backend, data, fps, rules)
+    report.add(name, reference_outcome, backend_outcome, reference_seconds, backend_seconds,
+               {"fps": fps, "rules": rules, "data": data})
+
+
+def run_properties(cases=200, seed=0, backend=live_convert, fps_values=(25, 24, 30)):
+    """
+    Runs property-based cases: whole conversions plus convert_time,
+    format_dialog_simple_split and the dialog path (default normalization
+    followed by split_dialog, which no longer re-strips) on random inputs.
+
+    Returns:
+        dict: DifferentialReport per area ("conversion", "convert_time", "format_dialog", "dialog")
+    """
+    rng = random.Random(seed)
+    reports = {"conversion": DifferentialReport(),
+               "convert_time": DifferentialReport(),
+               "format_dialog": DifferentialReport(),
+               "dialog": DifferentialReport()}
+    normalize = dialog_normalizer()
+
+    for n in range(cases):
+        fps = rng.choice(fps_values)
+        compare_conversion(reports["conversion"], f"property-{seed}-{n}",
+                           random_items(rng, fps), fps, random_rules(rng), backend)
+
+        timecode = random_timecode(rng, rng.randint(0, 36000000), fps)
+        if rng.random() < 0.1:
+            timecode = rng.choice(["", "00:00:01", "aa:00:00:00", "00:00:00:00:00", "-1:00:00:10"])
+        reference_result, reference_seconds = _timed(reference_engine.convert_time, timecode, fps)
+        backend_result, backend_seconds = _timed(convert_time, timecode, fps)
+        reports["convert_time"].add(f"convert_time-{n}", reference_result, backend_result,
+                                    reference_seconds, backend_seconds, {"time_str": timecode, "fps": fps})
+
+        text = random_dialog(rng).replace("\n", " ")
+        max_chars = rng.choice([10, 20, 37, 42])
+        reference_result, reference_seconds = _timed(reference_engine.format_dialog_simple_split, text, max_chars)
+        backend_result, backend_seconds = _timed(format_dialog_simple_split, text, max_chars)
+        reports["format_dialog"].add(f"format_dialog-{n}", reference_result, backend_result,
+                                     reference_seconds, backend_seconds, {"text": text, "max_chars": max_chars})
+
+        # Preprocesado de la referencia + formato, frente a normalización una vez + split_dialog
+        raw = random_dialog(rng)
+        reference_result, reference_seconds = _timed(
+            lambda: reference_engine.format_dialog_simple_split(raw.replace("\n", " ").strip(), max_chars))
+        backend_result, backend_seconds = _timed(lambda: split_dialog(normalize(raw), max_chars))
+        reports["dialog"].add(f"dialog-{n}", reference_result, backend_result,
+                              reference_seconds, backend_seconds, {"text": raw, "max_chars": max_chars})
+
+    return reports
+
+
+def run_corpus(paths, backend=live_convert, fps=25, rules=None):
+    """
+    Runs every JSON file of a corpus through both engines.
+
+    Returns:
+        DifferentialReport: Result of the corpus run
+    """
+    report = DifferentialReport()
+    for path in paths:
+        data = extract_data_from_json(load_json_file(path))
+        compare_conversion(report, os.path.basename(path), data, fps, rules, backend)
+    return report
+
+
+def dump_mismatches(reports, directory):
+    """Writes each mismatching input as a JSON file so it can be replayed."""
+    os.makedirs(directory, exist_ok=True)
+    written = []
+    for report in reports.values():
+        for mismatch in report.mismatches:
+            path = os.path.join(directory, f"{mismatch['name']}.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(mismatch["case"], f, ensure_ascii=False, indent=2)
+            written.append(path)
+    return written
+
+
+def record_run(path, reports, backend_name):
+    """Appends the summary of a run (including speedups) to a JSON Lines history file."""
+    entry = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "backend": backend_name,
+        "areas": {name: report.summary() for name, report in reports.items()},
+    }
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+    return entry
@@ -0,0 +1,204 @@
+"""
+Live conversion of NDJSON items, one line at a time.
+
+Only the merge buffer is kept in memory: a cue is finalized as soon as the
+next item cannot be merged into it (speaker change, gap beyond max_gap,
+max_dur or the two-line limit reached). The postprocess timing rules need the
+start of the following cue, so a cue is emitted when that item arrives, and
+the last one when the input ends. The output is byte-identical to converting
+the same items in one batch.
+"""
+import copy
+import json
+import time
+import logging
+from collections import deque
+
+from converter import normalize_item, resolve_rules, create_srt_entry
+from utils.character_utils import assign_color_code
+from utils.dialog_normalizer import dialog_normalizer, merge_continuation
+from utils.subtitle_rules import ms_to_srt_time, try_merge_subtitle, postprocess_subtitle
+
+logger = logging.getLogger(__name__)
+
+# Muestras de latencia conservadas para los percentiles (memoria constante)
+LATENCY_SAMPLES = 10000
+
+
+class LatencyStats:
+    """Running latency statistics over a bounded window of recent samples."""
+
+    def __init__(self, max_samples=LATENCY_SAMPLES):
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction):
+        """Returns a percentile (0-1) of the recent samples, in seconds."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self):
+        """Returns count, p50, p95 and max in milliseconds."""
+        return {
+            "count": self.count,
+            "p50_ms": round(self.percentile(0.50) * 1000, 3),
+            "p95_ms": round(self.percentile(0.95) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class LiveSubtitler:
+    """
+    Incremental converter: feed it items and it writes SRT entries as they
+    become final.
+    """
+
+    def __init__(self, write, fps=25, rules=None, top_characters=None, dialog_rules=None):
+        """
+        Args:
+            write (callable): Receives each piece of SRT text as it is emitted
+            fps (int): Frames per second of the timecodes
+            rules (dict): Subtitle rules (DEFAULT_RULES for the missing keys)
+            top_characters (list): Main characters, in color order
+            dialog_rules (dict): Dialog normalization rules (see utils.dialog_normalizer)
+        """
+        self.write = write
+        self.fps = fps
+        self.rules = resolve_rules(rules)
+        self.top_characters = list(top_characters or [])
+        self.normalize = dialog_normalizer(dialog_rules)
+        self.continuation = merge_continuation(dialog_rules)
+
+        self.buffer_sub = None        # Subtítulo pendiente de fusión
+        self.buffer_arrival = None    # Llegada del primer elemento del subtítulo pendiente
+        self.last_end_ms = -self.rules["min_gap"]
+        self.emitted = 0
+        self.skipped = 0
+
+        self.processing = LatencyStats()   # Tiempo de proceso de cada elemento
+        self.hold = LatencyStats()         # Desde que llega un subtítulo hasta que se emite
+
+    def feed(self, item):
+        """
+        Adds one item (a dict with IN, OUT, PERSONAJE, DIÁLOGO).
+
+        Returns:
+            int: Number of cues emitted by this item (0 or 1)
+        """
+        arrival = time.perf_counter()
+        current = normalize_item(item, self.fps, self.normalize)
+        if current is None:
+            self.skipped += 1
+            return 0
+
+        emitted = 0
+        if self.buffer_sub is None:
+            self._start_buffer(current, arrival)
+        elif not try_merge_subtitle(self.buffer_sub, current, self.rules["max_gap"],
+                                    self.rules["max_chars"], self.rules["max_dur"], self.continuation):
+            emitted = self._emit(current["start_ms"])
+            self._start_buffer(current, arrival)
+
+        self.processing.add(time.perf_counter() - arrival)
+        return emitted
+
+    def feed_line(self, line):
+        """
+        Adds one NDJSON line. Blank lines are ignored; invalid lines are
+        logged and skipped.
+
+        Returns:
+            int: Number of cues emitted by this line
+        """
+        line = line.strip()
+        if not line:
+            return 0
+        try:
+            item = json.loads(line)
+            if not isinstance(item, dict):
+                raise ValueError("expected a JSON object")
+            return self.feed(item)
+        except (ValueError, AttributeError) as e:
+            self.skipped += 1
+            logger.warning(f"Skipping invalid line: {e}")
+            return 0
+
+    def flush(self):
+        """
+        Emits the pending cue at the end of the input.
+
+        Returns:
+            int: Number of cues emitted (0 or 1)
+        """
+        if self.buffer_sub is None:
+            return 0
+        emitted = self._emit(None)
+        self.buffer_sub = None
+        return emitted
+
+    def _start_buffer(self, current, arrival):
+        self.buffer_sub = copy.deepcopy(current)
+        self.buffer_arrival = arrival
+
+    def _emit(self, next_start_ms):
+        """Applies the timing rules to the pending cue and writes it."""
+        processed, self.last_end_ms = postprocess_subtitle(
+            self.buffer_sub, next_start_ms, self.last_end_ms,
+            min_gap=self.rules["min_gap"], min_dur=self.rules["min_dur"], max_dur=self.rules["max_dur"],
+            max_chars=self.rules["max_chars"], cps=self.rules["cps"]
+        )
+        if processed is None:
+            return 0
+
+        self.emitted += 1
+        entry = create_srt_entry(
+            self.emitted,
+            ms_to_srt_time(processed["start_ms"]),
+            ms_to_srt_time(processed["end_ms"]),
+            assign_color_code(processed["character"], self.top_characters),
+            processed["dialog"]
+        )
+        # Mismo separador que render_srt: una línea en blanco entre entradas
+        self.write(entry if self.emitted == 1 else "\n" + entry)
+        self.hold.add(time.perf_counter() - self.buffer_arrival)
+        return 1
+
+    def stats(self):
+        """Returns the counters and latency statistics of the session."""
+        return {
+            "emitted": self.emitted,
+            "skipped": self.skipped,
+            "processing": self.processing.summary(),
+            "hold": self.hold.summary(),
+        }
+
+
+def run_live(lines, output, fps=25, rules=None, top_characters=None, dialog_rules=None):
+    """
+    Converts NDJSON lines as they arrive and writes the cues to a text stream.
+
+    Args:
+        lines (iterable): NDJSON lines (e.g. sys.stdin or a socket file)
+        output (file): Text stream; flushed after every cue
+
+    Returns:
+        LiveSubtitler: The finished subtitler (see stats())
+    """
+    def write(text):
+        output.write(text)
+        output.flush()
+
+    subtitler = LiveSubtitler(write, fps=fps, rules=rules, top_characters=top_characters,
+                              dialog_rules=dialog_rules)
+    for line in lines:
+        subtitler.feed_line(line)
+    subtitler.flush()
+    return subtitler
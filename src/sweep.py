@@ -0,0 +1,132 @@
+"""
+Rule-parameter sweep: evaluates a grid of subtitle rules over one parse.
+
+The input is loaded and normalized once; each parameter set only reruns the
+merge and postprocess stages, in parallel across worker processes.
+"""
+import os
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+
+from converter import load_subtitles, merge_with_rules, postprocess_with_rules, render_srt, resolve_rules
+from batch import qc_rule_values
+from utils.qc import check_subtitles
+from utils.output_writer import write_if_changed
+
+# Subtítulos normalizados (y reglas de diálogo) compartidos por cada proceso del pool
+_worker_subtitles = None
+_worker_dialog_rules = None
+
+
+def expand_grid(grid, base_rules=None):
+    """
+    Expands a grid of rule values into the list of parameter sets.
+
+    Args:
+        grid (dict): Rule name -> list of values to try
+        base_rules (dict): Fixed rule values for the keys not in the grid
+
+    Returns:
+        list: Complete rule dicts, one per combination
+    """
+    base = resolve_rules(base_rules)
+    keys = list(grid)
+    rule_sets = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        rules = dict(base)
+        rules.update(zip(keys, values))
+        rule_sets.append(resolve_rules(rules))
+    return rule_sets
+
+
+def evaluate_rules(subtitles, rules, dialog_rules=None):
+    """
+    Runs merge and postprocess with one parameter set and summarizes the result.
+    dialog_rules only choose the ellipsis added by the merge.
+
+    Returns:
+        dict: Rules, subtitle counts, merge ratio and QC violation counts
+    """
+    merged_subs = merge_with_rules(subtitles, rules, dialog_rules)
+    final_subs = postprocess_with_rules(merged_subs, rules)
+    report = check_subtitles(final_subs, **qc_rule_values(rules))
+    return {
+        "rules": rules,
+        "input": len(subtitles),
+        "merged": len(merged_subs),
+        "subtitles": len(final_subs),
+        # Proporción de intervenciones absorbidas por una fusión
+        "merge_ratio": round(1 - len(merged_subs) / len(subtitles), 4) if subtitles else 0.0,
+        "violations": report["violations"],
+        "total_violations": sum(report["violations"].values()),
+        "max_cps": report["max_cps"],
+    }
+
+
+def _init_worker(subtitles, dialog_rules=None):
+    global _worker_subtitles, _worker_dialog_rules
+    _worker_subtitles = subtitles
+    _worker_dialog_rules = dialog_rules
+
+
+def _evaluate_in_worker(rules):
+    return evaluate_rules(_worker_subtitles, rules, _worker_dialog_rules)
+
+
+def run_sweep(subtitles, rule_sets, workers=None, dialog_rules=None):
+    """
+    Evaluates every parameter set over the same normalized subtitles.
+
+    Args:
+        subtitles (list): Normalized subtitles (see converter.load_subtitles)
+        rule_sets (list): Parameter sets (see expand_grid)
+        workers (int): Worker processes (None = one per core, 1 = no pool)
+        dialog_rules (dict): Dialog rules of the load (for the merge ellipsis)
+
+    Returns:
+        list: One result per parameter set, in the same order
+    """
+    if workers == 1 or len(rule_sets) <= 1:
+        return [evaluate_rules(subtitles, rules, dialog_rules) for rules in rule_sets]
+
+    # Los subtítulos se envían una sola vez a cada proceso, no con cada tarea
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(subtitles, dialog_rules)) as executor:
+        return list(executor.map(_evaluate_in_worker, rule_sets))
+
+
+def best_result(results):
+    """Returns the position of the result with fewest violations (ties: fewest subtitles)."""
+    return min(range(len(results)),
+               key=lambda i: (results[i]["total_violations"], results[i]["subtitles"]))
+
+
+def sweep_file(json_file, grid, fps=25, base_rules=None, workers=None, input_options=None,
+               dialog_rules=None):
+    """
+    Loads a file once and evaluates a grid of rules over it.
+
+    Returns:
+        tuple: (results, normalized subtitles, top characters), so the chosen
+               set can be rendered without parsing the file again
+    """
+    subtitles, top_characters = load_subtitles(json_file, fps, input_options=input_options,
+                                               dialog_rules=dialog_rules)
+    results = run_sweep(subtitles, expand_grid(grid, base_rules), workers, dialog_rules)
+    return results, subtitles, top_characters
+
+
+def write_sweep_srt(output_file, subtitles, top_characters, rules, dialog_rules=None):
+    """
+    Renders and writes the SRT for one parameter set of a sweep. The file is
+    written atomically, and not at all if its content has not changed.
+
+    Returns:
+        bool: True if the file was written
+    """
+    output_dir = os.path.dirname(output_file)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    final_subs = postprocess_with_rules(merge_with_rules(subtitles, rules, dialog_rules), rules)
+    written, _ = write_if_changed(output_file, render_srt(final_subs, top_characters))
+    return written
@@ -15,6 +15,7 @@ from PyQt5.QtGui import QIcon, QFont, QPalette, QColor, QDragEnterEvent, QDropEv
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from converter import process_json_to_srt
+from ui.subtitle_preview import SubtitlePreview
 
 # Configure logging
 logging.basicConfig(
@@ -121,7 +122,7 @@ class ConverterWindow(QMainWindow):
         
         # Configure the window
         self.setWindowTitle("JSON to SRT Converter")
-        self.setGeometry(100, 100, 650, 450)
+        self.setGeometry(100, 100, 750, 800)
         
         # Set application icon
         icon_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "icon.ico")
@@ -189,6 +190,9 @@ class ConverterWindow(QMainWindow):
         
         # Convert button
         self.create_convert_button()
+        
+        # Preview of the converted subtitles
+        self.create_preview_section()
     
     def create_header(self):
         """Creates the header with title and description"""
@@ -360,7 +364,11 @@ class ConverterWindow(QMainWindow):
         button_layout.addItem(QSpacerItem(40, 20, QSizePolicy.Expanding, QSizePolicy.Minimum))
         
         self.main_layout.addLayout(button_layout)
-        self.main_layout.addStretch()
+    
+    def create_preview_section(self):
+        """Creates the preview table of the converted subtitles."""
+        self.preview = SubtitlePreview(self)
+        self.main_layout.addWidget(self.preview, 1)
     
     def browse_input(self):
         """Opens a file dialog to select the input JSON file."""
@@ -412,13 +420,16 @@ class ConverterWindow(QMainWindow):
         
         try:
             # Process the file with callback for progress updates
-            process_json_to_srt(
+            final_subs, top_characters = process_json_to_srt(
                 input_file, 
                 output_file,
                 fps=fps,
                 callback=self.progress_callback
             )
             
+            # Show the result in the preview pane
+            self.preview.set_subtitles(final_subs, top_characters, fps)
+            
             # Update progress and status
             self.progress_bar.setValue(100)
             self.status_label.setText("Conversión completada con éxito")
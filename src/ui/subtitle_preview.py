@@ -0,0 +1,231 @@
+"""
+Preview pane for the converted subtitles.
+
+The table model is lazy: rows are handed to the view in batches as the user
+scrolls (canFetchMore/fetchMore) and cell text is only built when a row is
+painted, so results with tens of thousands of subtitles stay responsive.
+"""
+from bisect import bisect_left
+
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
+                             QTableView, QHeaderView, QAbstractItemView, QPushButton)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QTimer
+
+from utils.character_utils import assign_color_code
+from utils.subtitle_rules import ms_to_srt_time, srt_time_to_ms
+from utils.time_utils import convert_time
+from utils.timeline_index import TimelineIndex
+
+
+class SubtitleTableModel(QAbstractTableModel):
+    """Lazy table model over the output of postprocess_subtitles."""
+
+    COLUMNS = ("#", "Inicio", "Fin", "Personaje", "Color", "Texto")
+    BATCH_SIZE = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._subtitles = []
+        self._top_characters = []
+        self._search_keys = []
+        self._rows = range(0)   # Índices de los subtítulos visibles (con filtro)
+        self._loaded = 0        # Filas ya entregadas a la vista
+        self._timeline = None
+
+    def set_subtitles(self, subtitles, top_characters):
+        """Replaces the previewed subtitles."""
+        self.beginResetModel()
+        self._subtitles = subtitles
+        self._top_characters = top_characters
+        # Texto de búsqueda precalculado una sola vez para que filtrar sea rápido
+        self._search_keys = [f"{sub['character'] or ''}\n{sub['dialog']}".lower() for sub in subtitles]
+        self._timeline = TimelineIndex(subtitles)
+        self._rows = range(len(subtitles))
+        self._loaded = min(self.BATCH_SIZE, len(self._rows))
+        self.endResetModel()
+
+    def set_filter(self, text):
+        """Shows only the subtitles whose character or text contains the given text."""
+        text = text.strip().lower()
+        self.beginResetModel()
+        if text:
+            self._rows = [i for i, key in enumerate(self._search_keys) if text in key]
+        else:
+            self._rows = range(len(self._subtitles))
+        self._loaded = min(self.BATCH_SIZE, len(self._rows))
+        self.endResetModel()
+
+    def visible_count(self):
+        """Returns the number of subtitles that match the current filter."""
+        return len(self._rows)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._rows)
+
+    def fetchMore(self, parent=QModelIndex()):
+        self._load_until(self._loaded + self.BATCH_SIZE - 1)
+
+    def _load_until(self, row):
+        """Makes sure rows up to the given one have been handed to the view."""
+        last = min(row, len(self._rows) - 1)
+        if last < self._loaded:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, last)
+        self._loaded = last + 1
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._loaded:
+            return None
+        position = self._rows[index.row()]
+        sub = self._subtitles[position]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return position + 1
+            if column == 1:
+                return ms_to_srt_time(sub["start_ms"])
+            if column == 2:
+                return ms_to_srt_time(sub["end_ms"])
+            if column == 3:
+                return sub["character"] or ""
+            if column == 4:
+                return assign_color_code(sub["character"], self._top_characters)
+            if column == 5:
+                return sub["dialog"].replace("\n", " / ")
+        elif role == Qt.ToolTipRole and column == 5:
+            return sub["dialog"]
+        elif role == Qt.TextAlignmentRole and column < 3:
+            return Qt.AlignCenter
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def row_for_time(self, time_ms):
+        """
+        Finds the visible row on screen at a time (or the next one after it),
+        loading rows up to it if needed.
+
+        Returns:
+            int or None: Row number, or None if no visible subtitle matches
+        """
+        if self._timeline is None or not self._rows:
+            return None
+        on_screen = self._timeline.at(time_ms)
+        position = on_screen[0] if on_screen else self._timeline.next_after(time_ms)
+        if position is None:
+            return None
+
+        # Las filas visibles están ordenadas, así que basta una búsqueda binaria
+        row = bisect_left(self._rows, position)
+        if row >= len(self._rows):
+            return None
+        self._load_until(row)
+        return row
+
+
+class SubtitlePreview(QWidget):
+    """Preview pane: filter box, jump-to-time box and the lazy subtitle table."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.fps = 25
+        self.model = SubtitleTableModel(self)
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        title = QLabel("Vista previa:")
+        title.setStyleSheet("font-weight: bold;")
+        layout.addWidget(title)
+
+        tools_layout = QHBoxLayout()
+        self.filter_entry = QLineEdit()
+        self.filter_entry.setPlaceholderText("Filtrar por texto o personaje")
+        self.filter_entry.setClearButtonEnabled(True)
+        tools_layout.addWidget(self.filter_entry, 1)
+
+        self.time_entry = QLineEdit()
+        self.time_entry.setPlaceholderText("hh:mm:ss:ff")
+        self.time_entry.setMaximumWidth(120)
+        tools_layout.addWidget(self.time_entry)
+
+        self.jump_button = QPushButton("Ir")
+        tools_layout.addWidget(self.jump_button)
+        layout.addLayout(tools_layout)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setAlternatingRowColors(True)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().setVisible(False)
+        # Altura de fila fija: la vista no tiene que medir cada fila
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(22)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        for column, width in enumerate((60, 100, 100, 120, 60)):
+            self.table.setColumnWidth(column, width)
+        layout.addWidget(self.table, 1)
+
+        self.count_label = QLabel("")
+        self.count_label.setStyleSheet("color: #666666; font-style: italic;")
+        layout.addWidget(self.count_label)
+
+        # Filtrar tras una breve pausa al escribir, no en cada tecla
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        self.filter_entry.textChanged.connect(lambda _: self.filter_timer.start())
+
+        self.time_entry.returnPressed.connect(self.jump_to_time)
+        self.jump_button.clicked.connect(self.jump_to_time)
+
+    def set_subtitles(self, subtitles, top_characters, fps=25):
+        """Shows a new conversion result."""
+        self.fps = fps
+        self.model.set_subtitles(subtitles, top_characters)
+        self.model.set_filter(self.filter_entry.text())
+        self.update_count()
+
+    def apply_filter(self):
+        self.model.set_filter(self.filter_entry.text())
+        self.update_count()
+
+    def update_count(self):
+        self.count_label.setText(f"{self.model.visible_count()} subtítulos")
+
+    def parse_time(self, text):
+        """Parses "hh:mm:ss:ff" (with the current fps) or "hh:mm:ss,mmm" into ms."""
+        text = text.strip()
+        if "," in text:
+            return srt_time_to_ms(text)
+        return srt_time_to_ms(convert_time(text, self.fps))
+
+    def jump_to_time(self):
+        """Selects the subtitle on screen at the typed time (or the next one)."""
+        try:
+            time_ms = self.parse_time(self.time_entry.text())
+        except ValueError:
+            self.time_entry.setStyleSheet("border: 1px solid #dc3545;")
+            return
+        self.time_entry.setStyleSheet("")
+
+        row = self.model.row_for_time(time_ms)
+        if row is None:
+            return
+        index = self.model.index(row, 0)
+        self.table.scrollTo(index, QAbstractItemView.PositionAtTop)
+        self.table.selectRow(row)
@@ -0,0 +1,124 @@
+"""
+Single-writer archive output for batch conversions.
+
+Rendered files are added straight into one zip or tar archive, so a batch
+does not have to write every SRT to disk and read it back to package it.
+"""
+import io
+import time
+import tarfile
+import zipfile
+
+# Extensión -> modo de tarfile
+_TAR_MODES = (
+    (".tar.gz", "w:gz"),
+    (".tgz", "w:gz"),
+    (".tar.bz2", "w:bz2"),
+    (".tar.xz", "w:xz"),
+    (".tar", "w"),
+)
+
+# Niveles de compresión admitidos por formato (bz2 no acepta 0; .tar sin comprimir lo ignora)
+_LEVEL_RANGES = {
+    "zip": (0, 9),
+    "w:gz": (0, 9),
+    "w:bz2": (1, 9),
+    "w:xz": (0, 9),
+}
+
+
+def archive_format(path):
+    """
+    Detects the archive format from the file name.
+
+    Returns:
+        tuple: ("zip", None) or ("tar", tarfile mode)
+
+    Raises:
+        ValueError: If the extension is not a supported archive type
+    """
+    lower = path.lower()
+    if lower.endswith(".zip"):
+        return "zip", None
+    for extension, mode in _TAR_MODES:
+        if lower.endswith(extension):
+            return "tar", mode
+    raise ValueError(f"Unsupported archive type: {path} (use .zip, .tar, .tar.gz, .tar.bz2 or .tar.xz)")
+
+
+class ArchiveWriter:
+    """
+    Writes named files into a zip or tar archive.
+
+    Not thread- or process-safe by design: a batch has exactly one writer
+    (the parent process) and the workers only return rendered content.
+    """
+
+    def __init__(self, path, compression_level=None):
+        """
+        Args:
+            path (str): Archive path; its extension selects the format
+            compression_level (int): Compression level (zip, gz: 0-9; bz2: 1-9;
+                xz: preset 0-9; ignored for an uncompressed .tar). None uses
+                the library default.
+
+        Raises:
+            ValueError: If the format is not supported or the level is out of
+                its range (checked before the archive is created)
+        """
+        self.path = path
+        self.names = set()
+        kind, mode = archive_format(path)
+        self.kind = kind
+
+        level_range = _LEVEL_RANGES.get(mode or kind)
+        if compression_level is not None and level_range is not None:
+            low, high = level_range
+            if not low <= compression_level <= high:
+                raise ValueError(f"Compression level for {path} must be between {low} and {high}, "
+                                 f"got {compression_level}")
+
+        if kind == "zip":
+            compression = zipfile.ZIP_STORED if compression_level == 0 else zipfile.ZIP_DEFLATED
+            self._archive = zipfile.ZipFile(path, "w", compression=compression,
+                                            compresslevel=compression_level or None)
+        else:
+            options = {}
+            if compression_level is not None and mode != "w":
+                options["preset" if mode == "w:xz" else "compresslevel"] = compression_level
+            self._archive = tarfile.open(path, mode, **options)
+
+    def add(self, name, data):
+        """
+        Adds one file to the archive.
+
+        Args:
+            name (str): Path inside the archive
+            data (bytes): File content
+
+        Raises:
+            ValueError: If the name was already added
+        """
+        name = name.replace("\\", "/")
+        if name in self.names:
+            raise ValueError(f"Duplicate file name in archive: {name}")
+        self.names.add(name)
+
+        if self.kind == "zip":
+            self._archive.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self._archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        """Finishes the archive."""
+        self._archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
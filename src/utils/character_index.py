@@ -0,0 +1,267 @@
+"""
+Persistent, series-wide index of character line counts.
+
+Colors are assigned from the top characters of a ranking. Ranking a single
+episode means a lead can change color between episodes, so this module keeps
+per-episode ``PERSONAJE`` counts in a small SQLite database and aggregates them
+per series without rereading the other scripts.
+"""
+import os
+import logging
+import sqlite3
+from collections import Counter
+
+from utils.character_utils import count_character_appearances
+from utils.input_adapters import iter_tabular_items, TABULAR_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    series      TEXT NOT NULL,
+    episode     TEXT NOT NULL,
+    fingerprint TEXT,
+    source      TEXT,
+    PRIMARY KEY (series, episode)
+);
+CREATE TABLE IF NOT EXISTS character_counts (
+    series    TEXT NOT NULL,
+    episode   TEXT NOT NULL,
+    character TEXT NOT NULL,
+    lines     INTEGER NOT NULL,
+    PRIMARY KEY (series, episode, character)
+);
+CREATE INDEX IF NOT EXISTS idx_character_counts_series
+    ON character_counts (series, character);
+"""
+
+
+def episode_name(path, series_root=None):
+    """
+    Derives the episode key used in the index from a script path.
+
+    Args:
+        path (str): Path to the episode script
+        series_root (str): Folder of the series. When given, the key keeps
+            the subfolders below it, so season1/ep01 and season2/ep01 are
+            different episodes.
+
+    Returns:
+        str: File name without extension, relative to series_root if given
+             (with "/" separators)
+    """
+    if series_root:
+        name = os.path.relpath(os.path.abspath(path), os.path.abspath(series_root))
+        return os.path.splitext(name)[0].replace(os.sep, "/")
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def file_fingerprint(path):
+    """
+    Builds a cheap fingerprint (size and modification time) for a file.
+
+    Args:
+        path (str): Path to the file
+
+    Returns:
+        str: Fingerprint string
+    """
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+class CharacterIndex:
+    """
+    SQLite-backed index of character counts per episode and series.
+    """
+
+    def __init__(self, db_path, series_root=None):
+        """
+        Opens (or creates) the index database.
+
+        Args:
+            db_path (str): Path to the SQLite file, or ":memory:"
+            series_root (str): Folder the episode keys are relative to (see episode_name)
+        """
+        self.db_path = db_path
+        self.series_root = series_root
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.executescript(_SCHEMA)
+        # Índices creados antes de guardar el archivo de origen de cada episodio
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(episodes)")}
+        if "source" not in columns:
+            self.conn.execute("ALTER TABLE episodes ADD COLUMN source TEXT")
+
+    def close(self):
+        """Closes the database connection."""
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def episode_key(self, path):
+        """Returns the episode key of a script path (see episode_name)."""
+        return episode_name(path, self.series_root)
+
+    def episode_keys(self, paths):
+        """
+        Maps each script path to its episode key.
+
+        Raises:
+            ValueError: If two paths map to the same key (e.g. ep01.json and
+                ep01.csv, or season1/ep01.json and season2/ep01.json without
+                a series root), since they would replace each other's counts
+        """
+        keys = {path: self.episode_key(path) for path in paths}
+        sources = {}
+        for path, key in keys.items():
+            sources.setdefault(key, []).append(path)
+        duplicates = [f"{key} ({', '.join(paths)})" for key, paths in sources.items() if len(paths) > 1]
+        if duplicates:
+            raise ValueError(f"Scripts with the same episode key: {'; '.join(duplicates)} "
+                             f"(use a series root that keeps them apart, or index only one)")
+        return keys
+
+    def get_fingerprint(self, series, episode):
+        """
+        Returns the fingerprint stored for an episode, or None if not indexed.
+        """
+        row = self.conn.execute(
+            "SELECT fingerprint FROM episodes WHERE series = ? AND episode = ?",
+            (series, episode),
+        ).fetchone()
+        return row[0] if row else None
+
+    def update_episode(self, series, episode, character_counter, fingerprint=None, source=None):
+        """
+        Replaces the counts of one episode. Other episodes are left untouched.
+
+        Args:
+            series (str): Series name
+            episode (str): Episode key
+            character_counter (Counter): Line counts per character
+            fingerprint (str): Optional fingerprint of the source file. When it
+                matches the stored one the update is skipped.
+            source (str): Optional path of the source file. If the episode was
+                indexed from another file, a warning is logged: two scripts
+                sharing a key replace each other's counts.
+
+        Returns:
+            bool: True if the index was modified
+        """
+        if fingerprint is not None and self.get_fingerprint(series, episode) == fingerprint:
+            return False
+
+        if source is not None:
+            source = os.path.abspath(source)
+            row = self.conn.execute(
+                "SELECT source FROM episodes WHERE series = ? AND episode = ?",
+                (series, episode),
+            ).fetchone()
+            if row and row[0] and row[0] != source:
+                logger.warning(f"Episode '{episode}' of '{series}' was indexed from {row[0]}; "
+                               f"replacing it with {source}")
+
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM character_counts WHERE series = ? AND episode = ?",
+                (series, episode),
+            )
+            self.conn.executemany(
+                "INSERT INTO character_counts (series, episode, character, lines) "
+                "VALUES (?, ?, ?, ?)",
+                [(series, episode, character, count)
+                 for character, count in character_counter.items() if count > 0],
+            )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO episodes (series, episode, fingerprint, source) "
+                "VALUES (?, ?, ?, ?)",
+                (series, episode, fingerprint, source),
+            )
+        return True
+
+    def index_file(self, series, json_path, json_content=None, input_options=None):
+        """
+        Indexes an episode script, skipping it if it has not changed.
+
+        Args:
+            series (str): Series name
+            json_path (str): Path to the JSON (or CSV/TSV) script
+            json_content (list or dict): Already loaded content, if available
+            input_options (dict): Options for CSV/TSV scripts (see utils.input_adapters)
+
+        Returns:
+            bool: True if the index was modified
+        """
+        episode = self.episode_key(json_path)
+        fingerprint = file_fingerprint(json_path)
+        if self.get_fingerprint(series, episode) == fingerprint:
+            return False
+
+        if json_content is None and json_path.lower().endswith(TABULAR_EXTENSIONS):
+            counter = Counter(item["PERSONAJE"] for item in iter_tabular_items(json_path, **(input_options or {}))
+                              if item.get("PERSONAJE"))
+        else:
+            if json_content is None:
+                # Importación local para evitar una dependencia circular con converter
+                from converter import load_json_file
+                json_content = load_json_file(json_path)
+            counter = count_character_appearances(json_content)
+        return self.update_episode(series, episode, counter, fingerprint, source=json_path)
+
+    def remove_episode(self, series, episode):
+        """Removes an episode from the index."""
+        with self.conn:
+            self.conn.execute(
+                "DELETE FROM character_counts WHERE series = ? AND episode = ?",
+                (series, episode),
+            )
+            self.conn.execute(
+                "DELETE FROM episodes WHERE series = ? AND episode = ?",
+                (series, episode),
+            )
+
+    def episodes(self, series):
+        """Returns the sorted list of episode keys indexed for a series."""
+        rows = self.conn.execute(
+            "SELECT episode FROM episodes WHERE series = ? ORDER BY episode",
+            (series,),
+        )
+        return [row[0] for row in rows]
+
+    def get_series_counter(self, series):
+        """
+        Aggregates the counts of every episode in a series.
+
+        Returns:
+            Counter: Counter object with character counts for the whole series
+        """
+        rows = self.conn.execute(
+            "SELECT character, SUM(lines) FROM character_counts "
+            "WHERE series = ? GROUP BY character",
+            (series,),
+        )
+        return Counter(dict(rows))
+
+    def get_top_characters(self, series, top_n=4):
+        """
+        Gets the top N characters of a whole series.
+
+        Ties are broken by character name so the ranking is stable across runs.
+
+        Args:
+            series (str): Series name
+            top_n (int): Number of top characters to return
+
+        Returns:
+            list: List of top character names, usable with assign_color_code
+        """
+        rows = self.conn.execute(
+            "SELECT character FROM character_counts WHERE series = ? "
+            "GROUP BY character ORDER BY SUM(lines) DESC, character ASC LIMIT ?",
+            (series, top_n),
+        )
+        return [row[0] for row in rows]
@@ -0,0 +1,104 @@
+"""
+Dialog text normalization, applied once to every item when it is read.
+
+The rules are compiled once (translate table plus precompiled regexes) and
+the compiled normalizer is cached, so converting a file only runs the table
+and the regexes over each text. With the default rules the result is the
+original preprocessing: line breaks become spaces and the text is stripped.
+
+Later stages rely on the normalized text: it has no line breaks and no
+leading or trailing whitespace.
+"""
+import re
+from functools import lru_cache
+
+DEFAULT_DIALOG_RULES = {
+    "collapse_whitespace": False,  # Reduce cada grupo de espacios/tabuladores a un espacio
+    "ellipsis": None,              # "unicode": "..." -> "…"; "ascii": "…" -> "..."
+    "quotes": None,                # "straight": comillas tipográficas -> " y '
+}
+
+_CHOICES = {
+    "collapse_whitespace": (False, True),
+    "ellipsis": (None, "unicode", "ascii"),
+    "quotes": (None, "straight"),
+}
+
+_STRAIGHT_QUOTES = {
+    "“": '"', "”": '"', "„": '"', "«": '"', "»": '"',
+    "‘": "'", "’": "'", "‚": "'",
+}
+
+
+def resolve_dialog_rules(rules=None):
+    """
+    Combines the given rules with DEFAULT_DIALOG_RULES and checks their values.
+
+    Raises:
+        ValueError: On unknown rules or values
+    """
+    resolved = dict(DEFAULT_DIALOG_RULES)
+    if rules:
+        unknown = set(rules) - set(DEFAULT_DIALOG_RULES)
+        if unknown:
+            raise ValueError(f"Unknown dialog rules: {', '.join(sorted(unknown))}")
+        resolved.update(rules)
+    for key, value in resolved.items():
+        if value not in _CHOICES[key]:
+            choices = ", ".join(str(choice) for choice in _CHOICES[key])
+            raise ValueError(f"Invalid value for dialog rule '{key}': {value} (expected one of {choices})")
+    return resolved
+
+
+@lru_cache(maxsize=None)
+def _compile(collapse_whitespace, ellipsis, quotes):
+    table = {}
+    if quotes == "straight":
+        table.update(_STRAIGHT_QUOTES)
+    if ellipsis == "ascii":
+        table["…"] = "..."
+
+    substitutions = []
+    if ellipsis == "unicode":
+        substitutions.append((re.compile(r"\.\.\."), "…"))
+    if collapse_whitespace:
+        substitutions.append((re.compile(r"\s+"), " "))
+
+    if not table and not substitutions:
+        # Reglas por defecto: el preprocesado original
+        def normalize(text):
+            return text.replace("\n", " ").strip()
+        return normalize
+
+    table["\n"] = " "
+    translation = str.maketrans(table)
+
+    def normalize(text):
+        text = text.translate(translation)
+        for pattern, replacement in substitutions:
+            text = pattern.sub(replacement, text)
+        return text.strip()
+    return normalize
+
+
+def merge_continuation(rules=None):
+    """
+    Returns the ellipsis the merge adds between two cues joined mid-sentence,
+    so merged text follows the ellipsis rule: "…" with ellipsis=unicode,
+    "..." otherwise.
+    """
+    return "…" if resolve_dialog_rules(rules)["ellipsis"] == "unicode" else "..."
+
+
+def dialog_normalizer(rules=None):
+    """
+    Returns the compiled normalizer for a set of dialog rules.
+
+    Args:
+        rules (dict): Dialog rules overriding DEFAULT_DIALOG_RULES
+
+    Returns:
+        callable: Function text -> normalized text (cached per set of rules)
+    """
+    resolved = resolve_dialog_rules(rules)
+    return _compile(resolved["collapse_whitespace"], resolved["ellipsis"], resolved["quotes"])
@@ -0,0 +1,153 @@
+"""
+Input adapters that feed CSV/TSV exports into the conversion pipeline.
+
+Rows are read one at a time and yielded as the same items the JSON input
+provides (``IN``, ``OUT``, ``PERSONAJE``, ``DIÁLOGO``), so the file is never
+loaded whole and no intermediate JSON is needed.
+"""
+import csv
+import codecs
+
+# Columnas que espera el conversor
+STANDARD_COLUMNS = ("IN", "OUT", "PERSONAJE", "DIÁLOGO")
+
+# Nombres alternativos aceptados por defecto (sin distinguir mayúsculas)
+COLUMN_ALIASES = {
+    "IN": ("in",),
+    "OUT": ("out",),
+    "PERSONAJE": ("personaje",),
+    "DIÁLOGO": ("diálogo", "dialogo"),
+}
+
+TABULAR_EXTENSIONS = (".csv", ".tsv", ".tab")
+
+_DELIMITERS = ("\t", ";", ",")
+
+
+def detect_encoding(path):
+    """
+    Detects the text encoding of a file from its first bytes.
+
+    Recognizes UTF-8 with BOM, UTF-16 with BOM (as written by Windows tools)
+    and BOM-less UTF-16 (NUL bytes in the first characters). Anything else is
+    read as UTF-8.
+
+    Returns:
+        str: Codec name suitable for open()
+    """
+    with open(path, "rb") as f:
+        head = f.read(4)
+
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith(codecs.BOM_UTF16_LE) or head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    if len(head) >= 2:
+        if head[0] != 0 and head[1] == 0:
+            return "utf-16-le"
+        if head[0] == 0 and head[1] != 0:
+            return "utf-16-be"
+    return "utf-8"
+
+
+def _detect_delimiter(header_line):
+    """Picks the delimiter that appears most often in the header line."""
+    counts = {delimiter: header_line.count(delimiter) for delimiter in _DELIMITERS}
+    delimiter = max(_DELIMITERS, key=lambda d: counts[d])
+    return delimiter if counts[delimiter] else ","
+
+
+def _resolve_columns(header, column_map=None):
+    """
+    Maps each standard column to its position in the header.
+
+    Args:
+        header (list): Header cells of the file
+        column_map (dict): Standard column -> header name in this file
+
+    Returns:
+        dict: Standard column -> index (columns not found are left out)
+
+    Raises:
+        ValueError: If a column given in column_map is not in the header
+    """
+    positions = {name.strip().lower(): i for i, name in enumerate(header)}
+    columns = {}
+    for standard in STANDARD_COLUMNS:
+        if column_map and standard in column_map:
+            wanted = column_map[standard].strip().lower()
+            if wanted not in positions:
+                raise ValueError(f"Column '{column_map[standard]}' not found in header: {header}")
+            columns[standard] = positions[wanted]
+            continue
+        for alias in COLUMN_ALIASES[standard]:
+            if alias in positions:
+                columns[standard] = positions[alias]
+                break
+    return columns
+
+
+def iter_tabular_rows(path, delimiter=None, column_map=None, encoding=None):
+    """
+    Yields the rows of a CSV/TSV file as items, with their line numbers.
+
+    Same arguments as iter_tabular_items. Cells are kept as read (IN/OUT
+    stripped); columns missing from the header or the row are left out.
+
+    Yields:
+        tuple: (columns, None) first, where columns maps each standard column
+               found in the header to its position; then (line number, item)
+               for every non-empty row
+    """
+    unknown = set(column_map or {}) - set(STANDARD_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown columns in column map: {', '.join(sorted(unknown))}")
+
+    with open(path, "r", encoding=encoding or detect_encoding(path), newline="") as f:
+        header_line = f.readline()
+        if not header_line:
+            return
+        if delimiter is None:
+            delimiter = _detect_delimiter(header_line)
+        header = next(csv.reader([header_line], delimiter=delimiter))
+        columns = _resolve_columns(header, column_map)
+        yield columns, None
+
+        reader = csv.reader(f, delimiter=delimiter)
+        for row in reader:
+            if not row:
+                continue
+            item = {}
+            for standard, position in columns.items():
+                if position >= len(row):
+                    continue
+                value = row[position]
+                if standard in ("IN", "OUT"):
+                    value = value.strip()
+                item[standard] = value
+            # +1 por la cabecera, leída aparte
+            yield reader.line_num + 1, item
+
+
+def iter_tabular_items(path, delimiter=None, column_map=None, encoding=None):
+    """
+    Yields subtitle items from a CSV/TSV file, one row at a time.
+
+    Args:
+        path (str): Path to the file
+        delimiter (str): Field delimiter; detected from the header if None
+        column_map (dict): Standard column -> header name, for files whose
+            headers differ from IN/OUT/PERSONAJE/DIÁLOGO
+        encoding (str): Text encoding; detected from the BOM if None
+
+    Yields:
+        dict: Item with the standard keys. Empty IN/OUT cells are left out,
+              so incomplete rows are skipped like incomplete JSON items.
+    """
+    rows = iter_tabular_rows(path, delimiter, column_map, encoding)
+    next(rows, None)  # Columnas de la cabecera
+    for _, item in rows:
+        for key in ("IN", "OUT"):
+            if key in item and not item[key]:
+                del item[key]
+        yield item
@@ -0,0 +1,145 @@
+"""
+Append-only journal of batch conversion jobs.
+
+Every state change of a job (started, done, failed) is appended as one JSON
+line. Appends are serialized with an exclusive file lock and written with a
+single write call, so many worker processes can share the journal. A line cut
+short by a crash is ignored when the journal is read back.
+"""
+import os
+import json
+import time
+import hashlib
+
+from utils.output_writer import file_hash
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+STARTED = "started"
+DONE = "done"
+FAILED = "failed"
+
+
+def job_key(input_file, params, input_hash=None):
+    """
+    Builds the key of a job from the input contents and the conversion parameters.
+
+    Args:
+        input_file (str): Path to the input file
+        params (dict): Parameters that affect the output (fps, rules...)
+        input_hash (str): SHA-256 of the input if already known
+
+    An input that cannot be read is keyed by its absolute path instead, so
+    its job is still journaled (and fails when it is converted).
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    if input_hash is None:
+        try:
+            input_hash = file_hash(input_file)
+        except OSError:
+            input_hash = None
+    if input_hash is None:
+        input_hash = "path:" + os.path.abspath(input_file)
+    digest = hashlib.sha256(input_hash.encode("utf-8"))
+    digest.update(json.dumps(params, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _lock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _unlock(fd):
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class BatchJournal:
+    """
+    Journal of batch jobs stored as JSON Lines.
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path to the journal file (created on first write)
+        """
+        self.path = path
+
+    def record(self, key, status, **fields):
+        """
+        Appends a state change for a job.
+
+        Args:
+            key (str): Job key (see job_key)
+            status (str): STARTED, DONE or FAILED
+            **fields: Extra information (input, output, error...)
+        """
+        entry = {"key": key, "status": status, "time": time.time(), "pid": os.getpid()}
+        entry.update(fields)
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            _lock(fd)
+            try:
+                # Si un proceso murió a mitad de línea, empezar en una línea nueva
+                size = os.fstat(fd).st_size
+                if size:
+                    os.lseek(fd, size - 1, os.SEEK_SET)
+                    if os.read(fd, 1) != b"\n":
+                        line = b"\n" + line
+                os.write(fd, line)
+                os.fsync(fd)
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+    def entries(self):
+        """
+        Reads every valid entry of the journal, in order.
+
+        Incomplete or corrupt lines (e.g. from a crash mid-write) are skipped.
+        """
+        if not os.path.exists(self.path):
+            return []
+        entries = []
+        with open(self.path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    continue
+                try:
+                    entries.append(json.loads(raw.decode("utf-8")))
+                except (ValueError, UnicodeDecodeError):
+                    continue
+        return entries
+
+    def states(self):
+        """
+        Returns the last known entry of each job.
+
+        Returns:
+            dict: Job key -> last entry
+        """
+        states = {}
+        for entry in self.entries():
+            states[entry["key"]] = entry
+        return states
+
+    def completed(self):
+        """Returns the set of keys whose last state is DONE."""
+        return {key for key, entry in self.states().items() if entry["status"] == DONE}
@@ -0,0 +1,164 @@
+"""
+Output writing that skips files whose content has not changed, plus the run
+manifest that records what each run produced.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+
+def hash_bytes(data):
+    """Returns the hex SHA-256 digest of a bytes object."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path):
+    """
+    Returns the hex SHA-256 digest of a file, or None if it does not exist.
+    """
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.hexdigest()
+
+
+def encode_text(content):
+    """
+    Encodes text exactly as a text-mode UTF-8 write would store it on this
+    platform (newlines translated to os.linesep).
+    """
+    if os.linesep != "\n":
+        content = content.replace("\n", os.linesep)
+    return content.encode("utf-8")
+
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# Leída una vez al importar: cambiar la umask no es seguro con varios hilos escribiendo
+_UMASK = _current_umask()
+
+
+def _file_mode(path):
+    """
+    Permission bits for a file written in place of path: those of the
+    existing file, or what open() would give a new one (0o666 minus umask).
+    """
+    try:
+        return os.stat(path).st_mode & 0o7777
+    except OSError:
+        return 0o666 & ~_UMASK
+
+
+def atomic_write(path, data):
+    """
+    Writes bytes to a temporary file next to the target and renames it into
+    place. The file keeps the mode of the one it replaces (mkstemp creates 0600).
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    mode = _file_mode(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_if_changed(path, content, known=None):
+    """
+    Writes text to a file unless the file already holds exactly those bytes.
+
+    Args:
+        path (str): Output path
+        content (str): Text to write
+        known (dict): Hash and size recorded for this path by a previous
+            manifest ({"hash": ..., "size": ...}). When the file still has that
+            size and the hash matches, the existing file is not read at all.
+
+    Returns:
+        tuple: (written, digest) where written is False if the write was skipped
+    """
+    data = encode_text(content)
+    digest = hash_bytes(data)
+
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        size = None
+
+    if size == len(data):
+        if known and known.get("hash") == digest and known.get("size") == size:
+            return False, digest
+        if file_hash(path) == digest:
+            return False, digest
+
+    atomic_write(path, data)
+    return True, digest
+
+
+class RunManifest:
+    """
+    Manifest of one run: input hash, output hash, parameters and timing per job.
+    """
+
+    def __init__(self, params=None):
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.params = params or {}
+        self.entries = []
+
+    def add(self, entry):
+        """Adds the result of one job."""
+        self.entries.append(entry)
+
+    def changed(self):
+        """Returns the entries whose output was actually (re)written."""
+        return [entry for entry in self.entries if entry.get("status") == "written"]
+
+    def to_dict(self):
+        # "changed" lists only the outputs rewritten in this run (the delivery to send)
+        return {"created": self.created, "params": self.params,
+                "changed": [entry["output"] for entry in self.changed()], "entries": self.entries}
+
+    def save(self, path):
+        """Saves the manifest as JSON (atomically)."""
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+        atomic_write(path, text.encode("utf-8"))
+
+    @staticmethod
+    def previous_entries(path):
+        """
+        Reads the entries of a previous manifest.
+
+        Returns:
+            dict: Output path -> entry; empty if there is no manifest
+        """
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {entry["output"]: entry for entry in data.get("entries", []) if entry.get("output")}
+
+    @staticmethod
+    def known_output(entry):
+        """
+        Returns the output hash and size recorded by a previous manifest entry,
+        as write_if_changed expects them, or None without an entry.
+        """
+        if not entry:
+            return None
+        return {"hash": entry.get("output_hash"), "size": entry.get("output_size")}
@@ -0,0 +1,119 @@
+"""
+Quality control of final subtitles against delivery rules.
+
+Works on the same list of dicts that ``postprocess_subtitles`` returns, so a
+file can be checked without rendering or writing the SRT.
+"""
+from utils.timeline_index import TimelineIndex
+
+# Reglas comprobadas, en el orden en que aparecen en los informes
+QC_RULES = ("cps", "min_dur", "max_dur", "min_gap", "max_chars", "overlap")
+
+
+def _empty_counts():
+    return {rule: 0 for rule in QC_RULES}
+
+
+def check_subtitles(subtitles, min_gap=24, min_dur=1000, max_dur=8000, max_chars=37, cps=15):
+    """
+    Computes QC metrics and violations for a list of final subtitles.
+
+    Metrics are computed column by column (durations, gaps, reading speeds)
+    over the whole list before the per-rule comparisons.
+
+    Args:
+        subtitles (list): Subtitles as returned by postprocess_subtitles
+        min_gap (int): Minimum gap between consecutive subtitles (ms)
+        min_dur (int): Minimum duration (ms)
+        max_dur (int): Maximum duration (ms)
+        max_chars (int): Maximum characters of the first line
+        cps (float): Target characters per second
+
+    Returns:
+        dict: Report with "subtitles", "violations" (counts per rule),
+              "issues" (list of individual violations, 1-based SRT indexes)
+              and reading-speed statistics
+    """
+    starts = [sub["start_ms"] for sub in subtitles]
+    ends = [sub["end_ms"] for sub in subtitles]
+    texts = [sub["dialog"] for sub in subtitles]
+
+    durations = [end - start for start, end in zip(starts, ends)]
+    visual_lengths = [len(text) - text.count('\n') for text in texts]
+    first_lines = [len(text.split('\n', 1)[0]) for text in texts]
+    speeds = [length * 1000 / dur if dur > 0 else float("inf")
+              for length, dur in zip(visual_lengths, durations)]
+    gaps = [start - prev_end for start, prev_end in zip(starts[1:], ends)]
+
+    issues = []
+
+    def collect(rule, values, predicate, limit, offset=0):
+        for i, value in enumerate(values):
+            if predicate(value):
+                if isinstance(value, float):
+                    value = round(value, 2)
+                issues.append({"index": i + offset + 1, "rule": rule, "value": value, "limit": limit})
+
+    if cps > 0:
+        collect("cps", speeds, lambda v: v > cps, cps)
+    collect("min_dur", durations, lambda v: v < min_dur, min_dur)
+    collect("max_dur", durations, lambda v: v > max_dur, max_dur)
+    # Los solapamientos (gap negativo) se informan aparte
+    collect("min_gap", gaps, lambda v: 0 <= v < min_gap, min_gap, offset=1)
+    collect("max_chars", first_lines, lambda v: v > max_chars, max_chars)
+
+    for i, j in TimelineIndex(subtitles).overlaps():
+        overlap_ms = min(ends[i], ends[j]) - max(starts[i], starts[j])
+        issues.append({"index": j + 1, "rule": "overlap", "value": overlap_ms,
+                       "limit": 0, "with": i + 1})
+
+    issues.sort(key=lambda issue: (issue["index"], QC_RULES.index(issue["rule"])))
+
+    violations = _empty_counts()
+    for issue in issues:
+        violations[issue["rule"]] += 1
+
+    finite_speeds = [v for v in speeds if v != float("inf")]
+    return {
+        "subtitles": len(subtitles),
+        "violations": violations,
+        "issues": issues,
+        "max_cps": round(max(finite_speeds), 2) if finite_speeds else 0.0,
+        "mean_cps": round(sum(finite_speeds) / len(finite_speeds), 2) if finite_speeds else 0.0,
+    }
+
+
+def aggregate_reports(reports):
+    """
+    Combines per-file QC reports into catalog totals.
+
+    Args:
+        reports (list): Per-file reports; entries with an "error" key count as failed files
+
+    Returns:
+        dict: Aggregate report
+    """
+    totals = _empty_counts()
+    files = failed = subtitles = files_with_violations = 0
+    max_cps = 0.0
+
+    for report in reports:
+        files += 1
+        if "error" in report:
+            failed += 1
+            continue
+        subtitles += report["subtitles"]
+        max_cps = max(max_cps, report["max_cps"])
+        if any(report["violations"].values()):
+            files_with_violations += 1
+        for rule, count in report["violations"].items():
+            totals[rule] += count
+
+    return {
+        "files": files,
+        "failed": failed,
+        "files_with_violations": files_with_violations,
+        "subtitles": subtitles,
+        "violations": totals,
+        "max_cps": max_cps,
+    }
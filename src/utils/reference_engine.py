@@ -0,0 +1,429 @@
+"""
+Frozen reference copy of the conversion engine.
+
+DO NOT OPTIMIZE OR "FIX" THIS MODULE. It is a verbatim snapshot of the
+original implementation of convert_time, merge_subtitles,
+postprocess_subtitles, format_dialog_simple_split and the SRT rendering,
+used by the differential harness (differential.py) as the source of truth:
+any faster backend must produce byte-for-byte the same SRT.
+"""
+import math
+from collections import Counter
+
+
+# --- time_utils ---
+
+def convert_time(time_str, fps=25):
+    """
+    Converts a time string with format "hh:mm:ss:ff" to "hh:mm:ss,mmm"
+    where frames are converted to milliseconds using fps.
+    """
+    try:
+        parts = time_str.split(":")
+        if len(parts) != 4:
+            raise ValueError(f"Incorrect time format: {time_str}")
+        h, m, s, f = map(int, parts)
+        total_ms = ((h * 3600 + m * 60 + s) * 1000) + round((f * 1000) / fps)
+        hh = total_ms // 3600000
+        total_ms %= 3600000
+        mm = total_ms // 60000
+        total_ms %= 60000
+        ss = total_ms // 1000
+        ms = total_ms % 1000
+        return f"{hh:02d}:{mm:02d}:{ss:02d},{ms:03d}"
+    except Exception as e:
+        raise ValueError(f"Error converting time '{time_str}': {e}")
+
+
+# --- character_utils ---
+
+def count_character_appearances(data):
+    """
+    Counts the appearances of each character in the data.
+    
+    Args:
+        data (list or dict): JSON data containing character information
+        
+    Returns:
+        Counter: Counter object with character counts
+    """
+    character_counter = Counter()
+    
+    # Check if data is in list format or inside a 'data' key
+    if isinstance(data, list):
+        data_list = data
+    elif isinstance(data, dict) and 'data' in data:
+        data_list = data['data']
+    else:
+        data_list = []
+    
+    for item in data_list:
+        if "PERSONAJE" in item and item["PERSONAJE"]:
+            character_counter[item["PERSONAJE"]] += 1
+    
+    return character_counter
+
+def get_top_characters(character_counter, top_n=4):
+    """
+    Gets the top N characters that speak the most.
+    
+    Args:
+        character_counter (Counter): Counter object with character counts
+        top_n (int): Number of top characters to return
+        
+    Returns:
+        list: List of top character names
+    """
+    return [char for char, _ in character_counter.most_common(top_n)]
+
+def assign_color_code(character, top_characters):
+    """
+    Assigns a color code based on the character's position in the top list.
+    
+    Args:
+        character (str): Character name
+        top_characters (list): List of top character names
+        
+    Returns:
+        str: Color code for the character
+    """
+    if character not in top_characters:
+        return "<BN1>"  # White - Not main character
+    
+    position = top_characters.index(character)
+    if position == 0:
+        return "<AN1>"  # Yellow - Main character 1
+    elif position == 1:
+        return "<CN1>"  # Light blue - Main character 2
+    elif position == 2:
+        return "<MN1>"  # Magenta - Main character 3
+    elif position == 3:
+        return "<VN1>"  # Green - Main character 4
+    else:
+        return "<BN1>"
+
+
+# --- subtitle_rules ---
+
+# Preferred punctuation characters for breaking (using Unicode ellipsis '…')
+PREFERRED_PUNCTUATION = '.,!?;:…'
+
+def format_dialog_simple_split(text, max_chars=37):
+    """
+    Formatea el texto en una o dos líneas.
+    - Si cabe en una línea (<= max_chars), devuelve una línea.
+    - Si no, busca el último espacio antes o en max_chars para crear la primera línea.
+      El resto del texto va a la segunda línea, sin importar su longitud.
+    - Si no hay espacios en la primera parte, fuerza el corte en max_chars.
+
+    Args:
+        text (str): El texto completo a formatear (ya preprocesado, sin \n internos).
+        max_chars (int): Máximo de caracteres para la PRIMERA línea.
+
+    Returns:
+        str: Texto formateado en una o dos líneas separadas por '\n'.
+    """
+    text = text.strip() # Asegurarse de que no hay espacios extra al inicio/final
+    if not text:
+        return ""
+    if len(text) <= max_chars:
+        return text # Cabe en una línea
+
+    # Buscar el último espacio ANTES o EN la posición max_chars
+    break_point = -1
+    # Consideramos romper justo DESPUÉS del espacio, así que buscamos <= max_chars
+    # Ajuste: buscar hasta max_chars inclusive
+    search_limit = min(max_chars, len(text) - 1)
+    for i in range(search_limit, 0, -1):
+        if text[i] == ' ':
+            # Verificamos que el carácter anterior no sea también un espacio
+            # y que no estemos al principio absoluto del texto si i=0
+            if i > 0 and text[i-1] != ' ':
+                 break_point = i
+                 break
+        # Considerar si el carácter EN max_chars es espacio (no necesario con el min anterior)
+
+    if break_point != -1:
+        # Romper en el espacio encontrado
+        line1 = text[:break_point].strip()
+        line2 = text[break_point+1:].strip()
+        # Asegurarse de que ninguna línea quede vacía si había espacios extra
+        if not line1: return line2 # Si la primera parte era solo espacio
+        if not line2: return line1 # Si la segunda parte era solo espacio
+        return f"{line1}\n{line2}"
+    else:
+        # No se encontró espacio adecuado antes de max_chars, forzar corte en max_chars
+        # Asegurarse de que max_chars no exceda la longitud del texto
+        split_point = min(max_chars, len(text))
+        line1 = text[:split_point].strip()
+        line2 = text[split_point:].strip()
+        if not line1: return line2
+        if not line2: return line1
+        # Evitar añadir línea vacía si no hay segunda parte
+        return f"{line1}\n{line2}" if line2 else line1
+
+
+# --- srt_time_to_ms, ms_to_srt_time (SIN CAMBIOS) ---
+def srt_time_to_ms(srt_time):
+    h, m, s_ms = srt_time.split(":")
+    s, ms = s_ms.split(",")
+    return int(h) * 3600000 + int(m) * 60000 + int(s) * 1000 + int(ms)
+
+def ms_to_srt_time(ms):
+    h = ms // 3600000
+    ms %= 3600000
+    m = ms // 60000
+    ms %= 60000
+    s = ms // 1000
+    milli = ms % 1000
+    return f"{h:02d}:{m:02d}:{s:02d},{milli:03d}"
+
+def merge_subtitles(subtitles,
+                    max_gap=3000,      # Gap máx. entre subtítulos para fusionar
+                    max_chars=37,      # Máx. 37 caracteres en la primera línea
+                    max_sub_dur=8000   # Máx. 8 segundos (8000 ms) por subtítulo
+                   ):
+    """
+    Fusiona subtítulos consecutivos si:
+      - Son del mismo personaje,
+      - El gap entre ellos es <= max_gap,
+      - Al combinar ambos no superan 8s totales,
+      - Y no se excede el límite de 2 líneas de 37 caracteres (74)
+        cuando ambas intervenciones, por separado, cumplen ese límite.
+
+    Si una intervención individual ya supera 74 caracteres, se omite la norma
+    para esa intervención (no podemos partirla), pero no se sigue concatenando
+    con otras que sí cumplen la norma, para no generar un subtítulo aún mayor.
+    """
+    if not subtitles:
+        return []
+
+    merged = []
+    if not subtitles:
+        return []
+
+    # Copia profunda para evitar modificar la lista original indirectamente
+    import copy
+    buffer_sub = copy.deepcopy(subtitles[0])
+
+    # Función auxiliar para saber si un texto cabe en 2 líneas de 37
+    def fits_in_two_lines(text, max_chars=37):
+        formatted = format_dialog_simple_split(text.strip(), max_chars)
+        # Verifica si hay más de un salto de línea (más de 2 líneas)
+        # O si alguna línea excede max_chars (aunque format_dialog debería prevenirlo)
+        lines = formatted.split('\n')
+        if len(lines) > 2:
+            return False
+        # La primera línea ya está limitada por format_dialog_simple_split
+        # La segunda línea puede ser más larga, así que verificamos la longitud total como proxy.
+        # Una comprobación más robusta verificaría cada línea individualmente si format_dialog cambiara.
+        return len(text.strip()) <= (2 * max_chars) # Aproximación simple usada antes
+        # Alternativa más precisa si format_dialog pudiera fallar:
+        # return all(len(line) <= max_chars for line in lines)
+
+    for i in range(1, len(subtitles)):
+        current = subtitles[i]
+        same_speaker = (current["character"] == buffer_sub["character"])
+        gap = current["start_ms"] - buffer_sub["end_ms"]
+
+        # Asegurarse de que los tiempos son coherentes (start <= end)
+        if buffer_sub["end_ms"] < buffer_sub["start_ms"]: buffer_sub["end_ms"] = buffer_sub["start_ms"]
+        if current["end_ms"] < current["start_ms"]: current["end_ms"] = current["start_ms"]
+        gap = current["start_ms"] - buffer_sub["end_ms"] # Recalcular por si acaso
+
+        if same_speaker and 0 <= gap <= max_gap:
+            # Duración si unimos buffer_sub + current
+            combined_duration = current["end_ms"] - buffer_sub["start_ms"]
+
+            if combined_duration <= max_sub_dur:
+                # Verificar longitudes individuales y combinadas
+                buffer_text = buffer_sub["dialog"].strip()
+                current_text = current["dialog"].strip()
+                # Usar '...' para indicar continuación natural si no hay puntuación fuerte
+                joiner = " "
+                if buffer_text and not buffer_text.endswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
+                   if current_text and not current_text.startswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
+                       joiner = "... " # O simplemente " " si prefieres no añadir puntos
+
+                combined_text = buffer_text + joiner + current_text
+
+                # Usar la función format_dialog para una mejor estimación del ajuste
+                buffer_fits = fits_in_two_lines(buffer_text, max_chars)
+                current_fits = fits_in_two_lines(current_text, max_chars)
+                combined_fits = fits_in_two_lines(combined_text, max_chars)
+
+
+                # Permitir fusión si el combinado cabe, independientemente de si los originales cabían.
+                # La lógica anterior era demasiado restrictiva.
+                if combined_fits:
+                    # Se pueden fusionar
+                    buffer_sub["dialog"] = combined_text
+                    buffer_sub["end_ms"] = current["end_ms"]
+                    # Si la duración combinada se ha vuelto negativa o cero (error en datos), forzar duración mínima
+                    if buffer_sub["end_ms"] <= buffer_sub["start_ms"]:
+                        buffer_sub["end_ms"] = buffer_sub["start_ms"] + 100 # Ajustar a un valor mínimo razonable
+                else:
+                    # No se fusionan porque el resultado excede las 2 líneas / 74 chars
+                    merged.append(buffer_sub)
+                    buffer_sub = copy.deepcopy(current)
+
+            else:
+                # Se excede la duración de 8s => no fusionar
+                merged.append(buffer_sub)
+                buffer_sub = copy.deepcopy(current)
+        else:
+            # Distinto personaje o gap inválido => no fusionar
+            merged.append(buffer_sub)
+            buffer_sub = copy.deepcopy(current)
+
+    # Agregar el último buffer_sub
+    merged.append(buffer_sub)
+    return merged
+
+
+# --- postprocess_subtitles: MODIFICADO ---
+def postprocess_subtitles(subtitles, min_gap=24, min_dur=1000, max_dur=8000, max_chars=37, cps=15):
+    """
+    Ajusta tiempos (gap, duración) y formatea el diálogo.
+    Aplica regla CPS para extender duración, pero NO si eso retrasa
+    el inicio original del siguiente subtítulo (respetando min_gap).
+    """
+    if not subtitles:
+        return []
+
+    processed_subs = []
+    last_end_ms = -min_gap  # Para permitir que el primer subtítulo empiece en 0
+
+    num_subs = len(subtitles)
+    for i, sub_data in enumerate(subtitles):
+        text_to_format = sub_data["dialog"]
+        original_start_ms = sub_data["start_ms"]
+        original_end_ms = sub_data["end_ms"]
+        character = sub_data["character"]
+
+        formatted_lines = format_dialog_simple_split(text_to_format, max_chars)
+        if not formatted_lines:
+            continue
+
+        # --- Ajuste de Tiempos ---
+        # 1. Ajustar inicio para cumplir min_gap con el subtítulo ANTERIOR PROCESADO
+        current_start_ms = max(original_start_ms, last_end_ms + min_gap)
+
+        # --- Calcular fin basado en reglas, pero con LÍMITE SUPERIOR ---
+
+        # 2. Calcular duración estimada por CPS
+        visual_text = formatted_lines.replace('\n', '')
+        num_lines = formatted_lines.count('\n') + 1
+        chars_per_second = cps
+        line_penalty = 1.1 if num_lines == 2 else 1.0 # Pequeña penalización por 2 líneas
+
+        # Evitar división por cero si CPS es 0
+        estimated_duration_ms_cps = 0
+        if chars_per_second > 0:
+             estimated_duration_ms_cps = (len(visual_text) / chars_per_second) * 1000 * line_penalty
+        
+        # Duración mínima requerida
+        required_duration_ms = max(min_dur, estimated_duration_ms_cps)
+
+        # 3. Calcular el fin MÍNIMO basado en inicio ajustado y duración mínima REQUERIDA
+        min_required_end_ms = current_start_ms + required_duration_ms
+
+        # 4. Determinar el LÍMITE SUPERIOR para el fin del subtítulo actual.
+        #    Este límite viene dado por el inicio original del SIGUIENTE subtítulo.
+        max_allowed_end_ms = current_start_ms + max_dur # Límite por max_dur
+        
+        # Si NO es el último subtítulo, considerar el inicio del siguiente
+        if i + 1 < num_subs:
+            next_original_start_ms = subtitles[i+1]["start_ms"]
+            # El final de este sub no puede pasar de (inicio_original_siguiente - min_gap)
+            limit_by_next = next_original_start_ms - min_gap
+            # Tomamos el MÍNIMO entre el límite de max_dur y el límite impuesto por el siguiente sub
+            max_allowed_end_ms = min(max_allowed_end_ms, limit_by_next)
+
+
+        # 5. Calcular el fin final:
+        #    - Debe ser al menos el fin mínimo requerido (min_required_end_ms)
+        #    - No debe exceder el límite superior calculado (max_allowed_end_ms)
+        #    - También debería respetar el fin original si es posterior al mínimo requerido,
+        #      pero sin pasarse del límite superior.
+        current_end_ms = max(min_required_end_ms, original_end_ms)
+        current_end_ms = min(current_end_ms, max_allowed_end_ms)
+
+        # 6. Asegurarse de que el fin no sea anterior al inicio + min_dur (última garantía)
+        #    Esto puede pasar si max_allowed_end_ms es muy restrictivo.
+        current_end_ms = max(current_end_ms, current_start_ms + min_dur)
+        
+        # 7. Asegurarse de que el fin no sea anterior al inicio (puede ocurrir con gaps negativos o datos raros)
+        if current_end_ms < current_start_ms:
+            current_end_ms = current_start_ms + min_dur # Forzar duración mínima
+
+        processed_subs.append({
+            "start_ms": int(round(current_start_ms)),
+            "end_ms": int(round(current_end_ms)),
+            "dialog": formatted_lines,
+            "character": character,
+            # Podrías añadir el CPS real para depuración si quieres:
+            # "cps_real": len(visual_text) / ((current_end_ms - current_start_ms) / 1000) if (current_end_ms - current_start_ms) > 0 else 0
+        })
+
+        # Actualizar fin para el cálculo del gap del SIGUIENTE subtítulo
+        last_end_ms = current_end_ms
+
+    return processed_subs
+
+
+# --- converter ---
+
+def create_srt_entry(index, start_time, end_time, color_code, dialog):
+    """
+    Crea la entrada SRT (texto) para un subtítulo.
+    """
+    # Asegurarse de que el diálogo no tenga espacios extra al inicio/final de las líneas
+    cleaned_dialog = "\n".join(line.strip() for line in dialog.strip().split('\n'))
+    return f"{index}\n{start_time} --> {end_time}\n{color_code}{cleaned_dialog}\n"
+
+
+def reference_convert(data, fps=25, rules=None):
+    """
+    Converts a list of JSON items to SRT text with the reference engine.
+
+    Args:
+        data (list): JSON items (IN, OUT, PERSONAJE, DIÁLOGO)
+        fps (int): Frames per second of the timecodes
+        rules (dict): Complete set of subtitle rules (see converter.DEFAULT_RULES)
+
+    Returns:
+        str: SRT content
+    """
+    character_counter = count_character_appearances(data)
+    top_characters = get_top_characters(character_counter)
+
+    subtitles = []
+    for item in data:
+        if "IN" in item and "OUT" in item and "DIÁLOGO" in item:
+            start_ms = srt_time_to_ms(convert_time(item["IN"], fps))
+            end_ms = srt_time_to_ms(convert_time(item["OUT"], fps))
+            dialog = item["DIÁLOGO"].replace('\n', ' ').strip()
+            subtitles.append({
+                "start_ms": start_ms,
+                "end_ms": end_ms,
+                "dialog": dialog,
+                "character": item.get("PERSONAJE", ""),
+                "original_dialog": item["DIÁLOGO"].strip()
+            })
+
+    merged_subs = merge_subtitles(subtitles, max_gap=rules["max_gap"],
+                                  max_chars=rules["max_chars"], max_sub_dur=rules["max_dur"])
+    final_subs = postprocess_subtitles(merged_subs, min_gap=rules["min_gap"], min_dur=rules["min_dur"],
+                                       max_dur=rules["max_dur"], max_chars=rules["max_chars"], cps=rules["cps"])
+
+    srt_content = []
+    for i, sub in enumerate(final_subs, start=1):
+        color_code = assign_color_code(sub["character"], top_characters)
+        srt_content.append(create_srt_entry(i, ms_to_srt_time(sub["start_ms"]),
+                                            ms_to_srt_time(sub["end_ms"]), color_code, sub["dialog"]))
+
+    if not srt_content:
+        raise ValueError("Could not generate SRT content from data")
+
+    return "\n".join(srt_content)
@@ -0,0 +1,93 @@
+"""
+Frame-rate retiming of already-normalized subtitles.
+
+PAL/NTSC versions of a program are produced by speeding it up or slowing it
+down (e.g. 23.976 -> 25 fps). Instead of converting the source again, the
+merged subtitles are scaled by an exact rational factor, shifted by an offset
+in milliseconds, and only the postprocess timing rules are run again.
+"""
+import math
+from fractions import Fraction
+
+# Frecuencias NTSC expresadas de forma exacta
+NTSC_RATES = {
+    "23.976": Fraction(24000, 1001),
+    "23.98": Fraction(24000, 1001),
+    "29.97": Fraction(30000, 1001),
+    "47.952": Fraction(48000, 1001),
+    "59.94": Fraction(60000, 1001),
+}
+
+
+def parse_rate(value):
+    """
+    Parses a frame rate into an exact Fraction.
+
+    Args:
+        value (str, int or Fraction): "25", "23.976", "24000/1001", 25...
+
+    Returns:
+        Fraction: Exact frame rate
+
+    Raises:
+        ValueError: If the value is not a valid positive rate (e.g. "abc"
+            or "1/0")
+    """
+    if isinstance(value, str):
+        value = value.strip()
+    try:
+        rate = NTSC_RATES.get(value) if isinstance(value, str) else None
+        if rate is None:
+            rate = Fraction(value)
+    except (ZeroDivisionError, TypeError, ValueError):
+        raise ValueError(f"Invalid frame rate: {value}") from None
+    if rate <= 0:
+        raise ValueError(f"Frame rate must be positive: {value}")
+    return rate
+
+
+def speed_factor(source_fps, target_fps):
+    """
+    Time scaling factor for playing material made at source_fps at target_fps.
+
+    Speeding 23.976 up to 25 gives 24000/25025 (times get shorter); slowing
+    25 down to 23.976 gives the inverse.
+
+    Returns:
+        Fraction: Factor to multiply every time by
+    """
+    return parse_rate(source_fps) / parse_rate(target_fps)
+
+
+def scale_ms(ms, factor, offset_ms=0):
+    """
+    Scales a time in ms by an exact factor, rounding half up, and adds an offset.
+    """
+    return math.floor(ms * factor + Fraction(1, 2)) + offset_ms
+
+
+def retime_subtitles(subtitles, factor=1, offset_ms=0):
+    """
+    Applies a speed factor and/or an offset to normalized subtitles.
+
+    Args:
+        subtitles (list): Subtitles with "start_ms"/"end_ms" (e.g. the output of merge_subtitles)
+        factor (Fraction, int or str): Exact time scaling factor (see speed_factor)
+        offset_ms (int): Offset added after scaling, in milliseconds
+
+    Returns:
+        list: New subtitle dicts. Subtitles that end at or before zero after
+              the offset are dropped; one that straddles zero starts at zero.
+    """
+    factor = Fraction(factor)
+    offset_ms = int(offset_ms)
+    retimed = []
+    for sub in subtitles:
+        end_ms = scale_ms(sub["end_ms"], factor, offset_ms)
+        if end_ms <= 0:
+            continue
+        new_sub = dict(sub)
+        new_sub["start_ms"] = max(0, scale_ms(sub["start_ms"], factor, offset_ms))
+        new_sub["end_ms"] = end_ms
+        retimed.append(new_sub)
+    return retimed
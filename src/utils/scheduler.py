@@ -0,0 +1,241 @@
+"""
+Job scheduling for batch conversions.
+
+Each input gets a cost estimate (file size and item count). Jobs run by
+priority and then largest first, so a huge file does not start last and
+leave the other cores idle at the end of a batch. A job is only admitted
+when its estimated memory fits the configured budget next to the jobs
+already running.
+"""
+import os
+import json
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# Estimación del pico de memoria de una conversión (lectura, fusión y SRT),
+# medido con tracemalloc: en archivos sintéticos con diálogos de 10 a 400
+# caracteres el ajuste es ~2,7 bytes por byte del JSON + ~370 por elemento.
+# Se redondea al alza para cubrir los episodios de ejemplo, cuyo pico es
+# ~7 veces el tamaño del JSON (~880 bytes por elemento).
+MEMORY_PER_BYTE = 3
+MEMORY_PER_ITEM = 500
+
+# Claves admitidas en cada trabajo de un archivo de trabajos
+JOB_SPEC_KEYS = ("input", "output", "fps", "rules", "priority")
+
+_SIZE_UNITS = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+
+
+def parse_size(text):
+    """
+    Parses a memory size such as "512M", "4G" or "1048576" into bytes.
+
+    Raises:
+        ValueError: If the text is not a positive size
+    """
+    value = text.strip().upper().rstrip("B")
+    unit = value[-1:] if value[-1:] in _SIZE_UNITS else ""
+    number = value[:-1] if unit else value
+    try:
+        size = int(float(number) * _SIZE_UNITS[unit])
+    except ValueError:
+        raise ValueError(f"Invalid memory size: {text}")
+    if size <= 0:
+        raise ValueError(f"Memory size must be positive: {text}")
+    return size
+
+
+def count_items(path):
+    """
+    Counts the items of an input file without parsing it.
+
+    JSON items are counted by their "IN" key; CSV/TSV rows by line breaks
+    (minus the header).
+    """
+    is_json = path.lower().endswith(".json")
+    marker = b'"IN"' if is_json else b"\n"
+    keep = len(marker) - 1
+    count = 0
+    tail = b""
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            # Se conserva el final del bloque anterior por si el marcador queda partido
+            data = tail + chunk
+            count += data.count(marker)
+            tail = data[len(data) - keep:] if keep else b""
+    if not is_json:
+        count = max(0, count - 1)
+    return count
+
+
+def estimate_job(path):
+    """
+    Estimates the cost of converting one input file.
+
+    Returns:
+        dict: {"size": bytes, "items": item count, "memory": estimated peak
+              bytes, "cost": relative runtime cost}. Unreadable files get a
+              zero estimate; the conversion itself reports the error.
+    """
+    try:
+        size = os.path.getsize(path)
+        items = count_items(path)
+    except OSError:
+        return {"size": 0, "items": 0, "memory": 0, "cost": 0}
+    return {
+        "size": size,
+        "items": items,
+        "memory": size * MEMORY_PER_BYTE + items * MEMORY_PER_ITEM,
+        # El tiempo de conversión crece con el número de elementos
+        "cost": items or size,
+    }
+
+
+def execution_order(jobs):
+    """
+    Returns the job indexes in execution order: highest priority first, then
+    largest cost first, then input order.
+    """
+    return sorted(range(len(jobs)), key=lambda i: (-jobs[i].get("priority", 0), -jobs[i].get("cost", 0), i))
+
+
+def run_jobs(fn, jobs, workers=None, memory_budget=None):
+    """
+    Runs jobs in execution order, admitting them against a memory budget.
+
+    A job starts when a worker is free and its estimated memory fits in the
+    budget next to the running jobs. When the next job in order does not
+    fit, its memory is reserved and only smaller jobs that fit beside that
+    reservation may start, so the large job is never starved. A job larger
+    than the whole budget runs alone.
+
+    Args:
+        fn (callable): Job function, called as fn(**job["kwargs"])
+        jobs (list): Dicts with "kwargs" and optionally "priority", "cost", "memory"
+        workers (int): Worker processes (None = one per core, 1 = no pool)
+        memory_budget (int): Bytes available to running jobs (None = no limit)
+
+    Yields:
+        tuple: (job index, result) in completion order
+    """
+    order = execution_order(jobs)
+    if workers == 1 or len(jobs) <= 1:
+        for i in order:
+            yield i, fn(**jobs[i]["kwargs"])
+        return
+
+    n_workers = workers or os.cpu_count() or 1
+    pending = list(order)
+    running = {}   # future -> índice del trabajo
+    used = 0       # Memoria estimada de los trabajos en marcha
+
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        while pending or running:
+            reserved = None   # Memoria reservada para el primer trabajo que no cabe
+            for i in list(pending):
+                if len(running) >= n_workers:
+                    break
+                need = jobs[i].get("memory", 0)
+                if (memory_budget is None or not running
+                        or used + (reserved or 0) + need <= memory_budget):
+                    pending.remove(i)
+                    running[executor.submit(fn, **jobs[i]["kwargs"])] = i
+                    used += need
+                elif reserved is None:
+                    reserved = need
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = running.pop(future)
+                used -= jobs[i].get("memory", 0)
+                yield i, future.result()
+
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _check_job_values(path, job):
+    """
+    Checks the types of a job's values.
+
+    Raises:
+        ValueError: If priority is not a number, fps is not a positive
+            integer, or rules is not an object of numbers
+    """
+    where = f"Job spec {path}, input {job['input']}"
+    if not isinstance(job["input"], str):
+        raise ValueError(f"Job spec {path}: 'input' must be a path, got {job['input']!r}")
+    if job.get("output") is not None and not isinstance(job["output"], str):
+        raise ValueError(f"{where}: 'output' must be a path, got {job['output']!r}")
+    if "priority" in job and not _is_number(job["priority"]):
+        raise ValueError(f"{where}: 'priority' must be a number, got {job['priority']!r}")
+    if "fps" in job and not (isinstance(job["fps"], int) and not isinstance(job["fps"], bool) and job["fps"] > 0):
+        raise ValueError(f"{where}: 'fps' must be a positive integer, got {job['fps']!r}")
+    if not isinstance(job["rules"], dict):
+        raise ValueError(f"{where}: 'rules' must be an object, got {job['rules']!r}")
+    for key, value in job["rules"].items():
+        if not _is_number(value):
+            raise ValueError(f"{where}: rule '{key}' must be a number, got {value!r}")
+
+
+def load_job_spec(path):
+    """
+    Reads a job-spec file: one entry per input with its own fps, rules,
+    output path and priority.
+
+    The file is JSON, either a list of jobs or {"defaults": {...}, "jobs": [...]}.
+    A job can be just the input path. Relative paths are resolved against
+    the folder of the spec file.
+
+        {"defaults": {"fps": 25, "rules": {"cps": 17}},
+         "jobs": [{"input": "ep01.json", "fps": 24, "priority": 10},
+                  "ep02.csv"]}
+
+    Returns:
+        list: Job dicts with "input" and any of "output", "fps", "rules", "priority"
+
+    Raises:
+        ValueError: If the file is not a valid job spec, or a value has the
+            wrong type (priority not a number, fps not a positive integer,
+            rules not an object of numbers)
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            spec = json.load(f)
+    except OSError as e:
+        raise ValueError(f"Cannot read job spec {path}: {e}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid job spec {path}: {e}")
+
+    if isinstance(spec, list):
+        spec = {"jobs": spec}
+    if not isinstance(spec, dict) or not isinstance(spec.get("jobs"), list):
+        raise ValueError(f"Job spec {path} must be a list of jobs or an object with a 'jobs' list")
+
+    defaults = spec.get("defaults", {})
+    if not isinstance(defaults, dict):
+        raise ValueError(f"Job spec {path}: 'defaults' must be an object")
+    if not isinstance(defaults.get("rules", {}), dict):
+        raise ValueError(f"Job spec {path}: 'rules' in 'defaults' must be an object")
+    base_dir = os.path.dirname(os.path.abspath(path))
+    jobs = []
+    for entry in spec["jobs"]:
+        if isinstance(entry, str):
+            entry = {"input": entry}
+        if not isinstance(entry, dict) or "input" not in entry:
+            raise ValueError(f"Job spec {path}: every job needs an 'input': {entry}")
+        unknown = (set(entry) | set(defaults)) - set(JOB_SPEC_KEYS)
+        if unknown:
+            raise ValueError(f"Job spec {path}: unknown keys {', '.join(sorted(unknown))}")
+
+        job = {key: value for key, value in defaults.items() if key not in ("input", "output")}
+        job.update(entry)
+        if not isinstance(entry.get("rules", {}), dict):
+            raise ValueError(f"Job spec {path}, input {entry['input']}: 'rules' must be an object")
+        job["rules"] = {**defaults.get("rules", {}), **entry.get("rules", {})}
+        _check_job_values(path, job)
+        job["input"] = os.path.join(base_dir, entry["input"])
+        if entry.get("output"):
+            job["output"] = os.path.join(base_dir, entry["output"])
+        jobs.append(job)
+    return jobs
@@ -1,5 +1,6 @@
 # utils/subtitle_rules.py
 
+import copy
 import math
 
 # Preferred punctuation characters for breaking (using Unicode ellipsis '…')
@@ -20,7 +21,15 @@ def format_dialog_simple_split(text, max_chars=37):
     Returns:
         str: Texto formateado en una o dos líneas separadas por '\n'.
     """
-    text = text.strip() # Asegurarse de que no hay espacios extra al inicio/final
+    return split_dialog(text.strip(), max_chars) # Asegurarse de que no hay espacios extra al inicio/final
+
+
+def split_dialog(text, max_chars=37):
+    """
+    Igual que format_dialog_simple_split, para texto ya normalizado
+    (utils.dialog_normalizer: sin \n y sin espacios al inicio/final), de
+    modo que no se vuelve a limpiar. Las líneas devueltas ya están limpias.
+    """
     if not text:
         return ""
     if len(text) <= max_chars:
@@ -75,10 +84,74 @@ def ms_to_srt_time(ms):
     milli = ms % 1000
     return f"{h:02d}:{m:02d}:{s:02d},{milli:03d}"
 
+# Función auxiliar para saber si un texto cabe en 2 líneas de 37
+def fits_in_two_lines(text, max_chars=37):
+    # El texto está normalizado (sin \n), así que split_dialog nunca da más de
+    # 2 líneas: basta la longitud total como aproximación (la de siempre).
+    return len(text) <= (2 * max_chars)
+
+
+def try_merge_subtitle(buffer_sub, current, max_gap=3000, max_chars=37, max_sub_dur=8000, continuation="..."):
+    """
+    Intenta fusionar `current` dentro de `buffer_sub` (un paso de merge_subtitles).
+
+    Si se cumplen las reglas de fusión, modifica buffer_sub y devuelve True.
+    Si no, devuelve False y buffer_sub queda cerrado: ningún subtítulo
+    posterior se fusionará con él. Igual que merge_subtitles, corrige los
+    tiempos incoherentes (fin < inicio) de ambos subtítulos.
+
+    continuation son los puntos suspensivos que se añaden al unir dos frases
+    sin puntuación ("..." o "…", ver utils.dialog_normalizer.merge_continuation).
+    """
+    same_speaker = (current["character"] == buffer_sub["character"])
+
+    # Asegurarse de que los tiempos son coherentes (start <= end)
+    if buffer_sub["end_ms"] < buffer_sub["start_ms"]: buffer_sub["end_ms"] = buffer_sub["start_ms"]
+    if current["end_ms"] < current["start_ms"]: current["end_ms"] = current["start_ms"]
+    gap = current["start_ms"] - buffer_sub["end_ms"]
+
+    if not (same_speaker and 0 <= gap <= max_gap):
+        # Distinto personaje o gap inválido => no fusionar
+        return False
+
+    # Duración si unimos buffer_sub + current
+    combined_duration = current["end_ms"] - buffer_sub["start_ms"]
+    if combined_duration > max_sub_dur:
+        # Se excede la duración de 8s => no fusionar
+        return False
+
+    # Verificar longitudes individuales y combinadas (textos ya normalizados)
+    buffer_text = buffer_sub["dialog"]
+    current_text = current["dialog"]
+    # Usar '...' para indicar continuación natural si no hay puntuación fuerte
+    joiner = " "
+    if buffer_text and not buffer_text.endswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
+       if current_text and not current_text.startswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
+           joiner = continuation + " " # O simplemente " " si prefieres no añadir puntos
+
+    # Si uno de los dos está vacío, el resultado es el otro, ya limpio
+    combined_text = buffer_text + joiner + current_text if buffer_text and current_text else buffer_text or current_text
+
+    # Permitir fusión si el combinado cabe, independientemente de si los originales cabían.
+    # La lógica anterior era demasiado restrictiva.
+    if not fits_in_two_lines(combined_text, max_chars):
+        # No se fusionan porque el resultado excede las 2 líneas / 74 chars
+        return False
+
+    # Se pueden fusionar
+    buffer_sub["dialog"] = combined_text
+    buffer_sub["end_ms"] = current["end_ms"]
+    # Si la duración combinada se ha vuelto negativa o cero (error en datos), forzar duración mínima
+    if buffer_sub["end_ms"] <= buffer_sub["start_ms"]:
+        buffer_sub["end_ms"] = buffer_sub["start_ms"] + 100 # Ajustar a un valor mínimo razonable
+    return True
+
+
 def merge_subtitles(subtitles,
                     max_gap=3000,      # Gap máx. entre subtítulos para fusionar
                     max_chars=37,      # Máx. 37 caracteres en la primera línea
-                    max_sub_dur=8000   # Máx. 8 segundos (8000 ms) por subtítulo
+                    max_sub_dur=8000,  # Máx. 8 segundos (8000 ms) por subtítulo
+                    continuation="..." # Puntos suspensivos al unir frases sin puntuación
                    ):
     """
     Fusiona subtítulos consecutivos si:
@@ -96,80 +169,13 @@ def merge_subtitles(subtitles,
         return []
 
     merged = []
-    if not subtitles:
-        return []
 
     # Copia profunda para evitar modificar la lista original indirectamente
-    import copy
     buffer_sub = copy.deepcopy(subtitles[0])
 
-    # Función auxiliar para saber si un texto cabe en 2 líneas de 37
-    def fits_in_two_lines(text, max_chars=37):
-        formatted = format_dialog_simple_split(text.strip(), max_chars)
-        # Verifica si hay más de un salto de línea (más de 2 líneas)
-        # O si alguna línea excede max_chars (aunque format_dialog debería prevenirlo)
-        lines = formatted.split('\n')
-        if len(lines) > 2:
-            return False
-        # La primera línea ya está limitada por format_dialog_simple_split
-        # La segunda línea puede ser más larga, así que verificamos la longitud total como proxy.
-        # Una comprobación más robusta verificaría cada línea individualmente si format_dialog cambiara.
-        return len(text.strip()) <= (2 * max_chars) # Aproximación simple usada antes
-        # Alternativa más precisa si format_dialog pudiera fallar:
-        # return all(len(line) <= max_chars for line in lines)
-
     for i in range(1, len(subtitles)):
         current = subtitles[i]
-        same_speaker = (current["character"] == buffer_sub["character"])
-        gap = current["start_ms"] - buffer_sub["end_ms"]
-
-        # Asegurarse de que los tiempos son coherentes (start <= end)
-        if buffer_sub["end_ms"] < buffer_sub["start_ms"]: buffer_sub["end_ms"] = buffer_sub["start_ms"]
-        if current["end_ms"] < current["start_ms"]: current["end_ms"] = current["start_ms"]
-        gap = current["start_ms"] - buffer_sub["end_ms"] # Recalcular por si acaso
-
-        if same_speaker and 0 <= gap <= max_gap:
-            # Duración si unimos buffer_sub + current
-            combined_duration = current["end_ms"] - buffer_sub["start_ms"]
-
-            if combined_duration <= max_sub_dur:
-                # Verificar longitudes individuales y combinadas
-                buffer_text = buffer_sub["dialog"].strip()
-                current_text = current["dialog"].strip()
-                # Usar '...' para indicar continuación natural si no hay puntuación fuerte
-                joiner = " "
-                if buffer_text and not buffer_text.endswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
-                   if current_text and not current_text.startswith(tuple(PREFERRED_PUNCTUATION + " '\"")):
-                       joiner = "... " # O simplemente " " si prefieres no añadir puntos
-
-                combined_text = buffer_text + joiner + current_text
-
-                # Usar la función format_dialog para una mejor estimación del ajuste
-                buffer_fits = fits_in_two_lines(buffer_text, max_chars)
-                current_fits = fits_in_two_lines(current_text, max_chars)
-                combined_fits = fits_in_two_lines(combined_text, max_chars)
-
-
-                # Permitir fusión si el combinado cabe, independientemente de si los originales cabían.
-                # La lógica anterior era demasiado restrictiva.
-                if combined_fits:
-                    # Se pueden fusionar
-                    buffer_sub["dialog"] = combined_text
-                    buffer_sub["end_ms"] = current["end_ms"]
-                    # Si la duración combinada se ha vuelto negativa o cero (error en datos), forzar duración mínima
-                    if buffer_sub["end_ms"] <= buffer_sub["start_ms"]:
-                        buffer_sub["end_ms"] = buffer_sub["start_ms"] + 100 # Ajustar a un valor mínimo razonable
-                else:
-                    # No se fusionan porque el resultado excede las 2 líneas / 74 chars
-                    merged.append(buffer_sub)
-                    buffer_sub = copy.deepcopy(current)
-
-            else:
-                # Se excede la duración de 8s => no fusionar
-                merged.append(buffer_sub)
-                buffer_sub = copy.deepcopy(current)
-        else:
-            # Distinto personaje o gap inválido => no fusionar
+        if not try_merge_subtitle(buffer_sub, current, max_gap, max_chars, max_sub_dur, continuation):
             merged.append(buffer_sub)
             buffer_sub = copy.deepcopy(current)
 
@@ -178,6 +184,90 @@ def merge_subtitles(subtitles,
     return merged
 
 
+def postprocess_subtitle(sub_data, next_start_ms, last_end_ms,
+                         min_gap=24, min_dur=1000, max_dur=8000, max_chars=37, cps=15):
+    """
+    Ajusta tiempos y formato de UN subtítulo (un paso de postprocess_subtitles).
+
+    Args:
+        sub_data (dict): Subtítulo fusionado
+        next_start_ms (int): Inicio original del siguiente subtítulo, o None si es el último
+        last_end_ms (float): Fin (sin redondear) del subtítulo anterior procesado
+
+    Returns:
+        tuple: (subtítulo procesado o None si el texto queda vacío, nuevo last_end_ms)
+    """
+    text_to_format = sub_data["dialog"]
+    original_start_ms = sub_data["start_ms"]
+    original_end_ms = sub_data["end_ms"]
+    character = sub_data["character"]
+
+    formatted_lines = split_dialog(text_to_format, max_chars)
+    if not formatted_lines:
+        return None, last_end_ms
+
+    # --- Ajuste de Tiempos ---
+    # 1. Ajustar inicio para cumplir min_gap con el subtítulo ANTERIOR PROCESADO
+    current_start_ms = max(original_start_ms, last_end_ms + min_gap)
+
+    # --- Calcular fin basado en reglas, pero con LÍMITE SUPERIOR ---
+
+    # 2. Calcular duración estimada por CPS
+    visual_text = formatted_lines.replace('\n', '')
+    num_lines = formatted_lines.count('\n') + 1
+    chars_per_second = cps
+    line_penalty = 1.1 if num_lines == 2 else 1.0 # Pequeña penalización por 2 líneas
+
+    # Evitar división por cero si CPS es 0
+    estimated_duration_ms_cps = 0
+    if chars_per_second > 0:
+         estimated_duration_ms_cps = (len(visual_text) / chars_per_second) * 1000 * line_penalty
+
+    # Duración mínima requerida
+    required_duration_ms = max(min_dur, estimated_duration_ms_cps)
+
+    # 3. Calcular el fin MÍNIMO basado en inicio ajustado y duración mínima REQUERIDA
+    min_required_end_ms = current_start_ms + required_duration_ms
+
+    # 4. Determinar el LÍMITE SUPERIOR para el fin del subtítulo actual.
+    #    Este límite viene dado por el inicio original del SIGUIENTE subtítulo.
+    max_allowed_end_ms = current_start_ms + max_dur # Límite por max_dur
+
+    # Si NO es el último subtítulo, considerar el inicio del siguiente
+    if next_start_ms is not None:
+        # El final de este sub no puede pasar de (inicio_original_siguiente - min_gap)
+        limit_by_next = next_start_ms - min_gap
+        # Tomamos el MÍNIMO entre el límite de max_dur y el límite impuesto por el siguiente sub
+        max_allowed_end_ms = min(max_allowed_end_ms, limit_by_next)
+
+    # 5. Calcular el fin final:
+    #    - Debe ser al menos el fin mínimo requerido (min_required_end_ms)
+    #    - No debe exceder el límite superior calculado (max_allowed_end_ms)
+    #    - También debería respetar el fin original si es posterior al mínimo requerido,
+    #      pero sin pasarse del límite superior.
+    current_end_ms = max(min_required_end_ms, original_end_ms)
+    current_end_ms = min(current_end_ms, max_allowed_end_ms)
+
+    # 6. Asegurarse de que el fin no sea anterior al inicio + min_dur (última garantía)
+    #    Esto puede pasar si max_allowed_end_ms es muy restrictivo.
+    current_end_ms = max(current_end_ms, current_start_ms + min_dur)
+
+    # 7. Asegurarse de que el fin no sea anterior al inicio (puede ocurrir con gaps negativos o datos raros)
+    if current_end_ms < current_start_ms:
+        current_end_ms = current_start_ms + min_dur # Forzar duración mínima
+
+    processed = {
+        "start_ms": int(round(current_start_ms)),
+        "end_ms": int(round(current_end_ms)),
+        "dialog": formatted_lines,
+        "character": character,
+        # Podrías añadir el CPS real para depuración si quieres:
+        # "cps_real": len(visual_text) / ((current_end_ms - current_start_ms) / 1000) if (current_end_ms - current_start_ms) > 0 else 0
+    }
+    # El fin sin redondear se usa para el gap del SIGUIENTE subtítulo
+    return processed, current_end_ms
+
+
 # --- postprocess_subtitles: MODIFICADO ---
 def postprocess_subtitles(subtitles, min_gap=24, min_dur=1000, max_dur=8000, max_chars=37, cps=15):
     """
@@ -193,78 +283,13 @@ def postprocess_subtitles(subtitles, min_gap=24, min_dur=1000, max_dur=8000, max
 
     num_subs = len(subtitles)
     for i, sub_data in enumerate(subtitles):
-        text_to_format = sub_data["dialog"]
-        original_start_ms = sub_data["start_ms"]
-        original_end_ms = sub_data["end_ms"]
-        character = sub_data["character"]
-
-        formatted_lines = format_dialog_simple_split(text_to_format, max_chars)
-        if not formatted_lines:
-            continue
-
-        # --- Ajuste de Tiempos ---
-        # 1. Ajustar inicio para cumplir min_gap con el subtítulo ANTERIOR PROCESADO
-        current_start_ms = max(original_start_ms, last_end_ms + min_gap)
-
-        # --- Calcular fin basado en reglas, pero con LÍMITE SUPERIOR ---
-
-        # 2. Calcular duración estimada por CPS
-        visual_text = formatted_lines.replace('\n', '')
-        num_lines = formatted_lines.count('\n') + 1
-        chars_per_second = cps
-        line_penalty = 1.1 if num_lines == 2 else 1.0 # Pequeña penalización por 2 líneas
-
-        # Evitar división por cero si CPS es 0
-        estimated_duration_ms_cps = 0
-        if chars_per_second > 0:
-             estimated_duration_ms_cps = (len(visual_text) / chars_per_second) * 1000 * line_penalty
-        
-        # Duración mínima requerida
-        required_duration_ms = max(min_dur, estimated_duration_ms_cps)
-
-        # 3. Calcular el fin MÍNIMO basado en inicio ajustado y duración mínima REQUERIDA
-        min_required_end_ms = current_start_ms + required_duration_ms
-
-        # 4. Determinar el LÍMITE SUPERIOR para el fin del subtítulo actual.
-        #    Este límite viene dado por el inicio original del SIGUIENTE subtítulo.
-        max_allowed_end_ms = current_start_ms + max_dur # Límite por max_dur
-        
-        # Si NO es el último subtítulo, considerar el inicio del siguiente
-        if i + 1 < num_subs:
-            next_original_start_ms = subtitles[i+1]["start_ms"]
-            # El final de este sub no puede pasar de (inicio_original_siguiente - min_gap)
-            limit_by_next = next_original_start_ms - min_gap
-            # Tomamos el MÍNIMO entre el límite de max_dur y el límite impuesto por el siguiente sub
-            max_allowed_end_ms = min(max_allowed_end_ms, limit_by_next)
-
-
-        # 5. Calcular el fin final:
-        #    - Debe ser al menos el fin mínimo requerido (min_required_end_ms)
-        #    - No debe exceder el límite superior calculado (max_allowed_end_ms)
-        #    - También debería respetar el fin original si es posterior al mínimo requerido,
-        #      pero sin pasarse del límite superior.
-        current_end_ms = max(min_required_end_ms, original_end_ms)
-        current_end_ms = min(current_end_ms, max_allowed_end_ms)
-
-        # 6. Asegurarse de que el fin no sea anterior al inicio + min_dur (última garantía)
-        #    Esto puede pasar si max_allowed_end_ms es muy restrictivo.
-        current_end_ms = max(current_end_ms, current_start_ms + min_dur)
-        
-        # 7. Asegurarse de que el fin no sea anterior al inicio (puede ocurrir con gaps negativos o datos raros)
-        if current_end_ms < current_start_ms:
-            current_end_ms = current_start_ms + min_dur # Forzar duración mínima
-
-        processed_subs.append({
-            "start_ms": int(round(current_start_ms)),
-            "end_ms": int(round(current_end_ms)),
-            "dialog": formatted_lines,
-            "character": character,
-            # Podrías añadir el CPS real para depuración si quieres:
-            # "cps_real": len(visual_text) / ((current_end_ms - current_start_ms) / 1000) if (current_end_ms - current_start_ms) > 0 else 0
-        })
-
-        # Actualizar fin para el cálculo del gap del SIGUIENTE subtítulo
-        last_end_ms = current_end_ms
+        next_start_ms = subtitles[i+1]["start_ms"] if i + 1 < num_subs else None
+        processed, last_end_ms = postprocess_subtitle(
+            sub_data, next_start_ms, last_end_ms,
+            min_gap=min_gap, min_dur=min_dur, max_dur=max_dur, max_chars=max_chars, cps=cps
+        )
+        if processed is not None:
+            processed_subs.append(processed)
 
     return processed_subs
 
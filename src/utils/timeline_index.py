@@ -0,0 +1,204 @@
+"""
+Interval index over a subtitle timeline.
+
+Built once from the ``start_ms``/``end_ms`` values produced by
+``postprocess_subtitles`` (or any list of subtitle dicts), it answers
+point-in-time, range and overlap queries without scanning the whole list.
+
+Intervals are half-open: a subtitle is on screen for ``start_ms <= t < end_ms``.
+"""
+from bisect import bisect_left
+
+# Subárboles de hasta este tamaño se guardan como una hoja y se recorren enteros
+_LEAF_SIZE = 32
+
+
+class TimelineIndex:
+    """
+    Interval index: a sorted array for ordered lookups plus a static centered
+    interval tree for point and range queries.
+
+    Each tree node keeps the subtitles that contain its center time, sorted
+    by start and by end; the rest go to the left or right child (small
+    subtrees are leaves scanned whole). The center is the median start of
+    the node, so the tree has O(log n) levels and a query costs
+    O(log n + k log k) for k results, whatever the durations (a single
+    subtitle spanning the whole timeline does not slow the others).
+    """
+
+    def __init__(self, subtitles):
+        """
+        Builds the index.
+
+        Args:
+            subtitles (list): List of dicts with "start_ms" and "end_ms" keys
+        """
+        self.subtitles = subtitles
+        # Posiciones ordenadas por inicio (y fin como desempate)
+        self._order = sorted(
+            range(len(subtitles)),
+            key=lambda i: (subtitles[i]["start_ms"], subtitles[i]["end_ms"]),
+        )
+        self._starts = [subtitles[i]["start_ms"] for i in self._order]
+        self._ends = [subtitles[i]["end_ms"] for i in self._order]
+
+        self._root = None
+        self._built = False
+
+    def _tree(self):
+        """Returns the interval tree, built on the first point or range query."""
+        if not self._built:
+            # Los intervalos vacíos nunca están en pantalla: no entran en el árbol
+            self._root = self._build([j for j in range(len(self._order)) if self._ends[j] > self._starts[j]])
+            self._built = True
+        return self._root
+
+    def _build(self, ranks):
+        """
+        Builds the subtree for the given positions (ranks in start order).
+
+        Returns:
+            tuple or None: (center, by_start, by_end, left, right), where
+            by_start/by_end hold (time, rank) pairs of the subtitles that
+            contain the center; a leaf is (None, ranks, None, None, None)
+        """
+        if not ranks:
+            return None
+        if len(ranks) <= _LEAF_SIZE:
+            return (None, ranks, None, None, None)
+        starts, ends = self._starts, self._ends
+        # ranks llega ordenado por inicio: la mediana es el elemento central y
+        # los que empiezan después del centro son un sufijo
+        middle = len(ranks) // 2
+        center = starts[ranks[middle]]
+        split = middle + 1
+        while split < len(ranks) and starts[ranks[split]] <= center:
+            split += 1
+        before = ranks[:split]
+        here = [j for j in before if ends[j] > center]
+        by_start = [(starts[j], j) for j in here]
+        by_end = sorted([(ends[j], j) for j in here], reverse=True)
+        left = [j for j in before if ends[j] <= center] if len(here) < split else []
+        return (center, by_start, by_end, self._build(left), self._build(ranks[split:]))
+
+    def __len__(self):
+        return len(self._order)
+
+    def _collect(self, start_ms, end_ms):
+        """Ranks of the non-empty subtitles overlapping [start_ms, end_ms), in start order."""
+        starts, ends = self._starts, self._ends
+        found = []
+        stack = [self._tree()]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            center, by_start, by_end, left, right = node
+            if center is None:
+                found.extend(j for j in by_start if starts[j] < end_ms and ends[j] > start_ms)
+            elif end_ms <= center:
+                # Todos los de este nodo terminan después del rango: basta con que empiecen antes de su fin
+                for start, j in by_start:
+                    if start >= end_ms:
+                        break
+                    found.append(j)
+                stack.append(left)
+            elif start_ms > center:
+                # Todos empiezan antes del rango: basta con que terminen después de su inicio
+                for end, j in by_end:
+                    if end <= start_ms:
+                        break
+                    found.append(j)
+                stack.append(right)
+            else:
+                # El rango contiene el centro: todos los del nodo se solapan con él
+                found.extend(j for _, j in by_start)
+                stack.append(left)
+                stack.append(right)
+        found.sort()
+        return found
+
+    def at(self, time_ms):
+        """
+        Finds the subtitles on screen at a given time.
+
+        Args:
+            time_ms (int): Time in milliseconds
+
+        Returns:
+            list: Indexes into the original list, sorted by start time
+        """
+        starts, ends = self._starts, self._ends
+        found = []
+        node = self._tree()
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if center is None:
+                found.extend(j for j in by_start if starts[j] <= time_ms < ends[j])
+                break
+            if time_ms < center:
+                for start, j in by_start:
+                    if start > time_ms:
+                        break
+                    found.append(j)
+                node = left
+            elif time_ms > center:
+                for end, j in by_end:
+                    if end <= time_ms:
+                        break
+                    found.append(j)
+                node = right
+            else:
+                found.extend(j for _, j in by_start)
+                break
+        found.sort()
+        return [self._order[j] for j in found]
+
+    def between(self, start_ms, end_ms):
+        """
+        Finds the subtitles visible at any moment of [start_ms, end_ms).
+
+        Args:
+            start_ms (int): Range start in milliseconds
+            end_ms (int): Range end in milliseconds (exclusive)
+
+        Returns:
+            list: Indexes into the original list, sorted by start time.
+                  Empty subtitles (start == end) are never visible.
+        """
+        if end_ms <= start_ms:
+            return []
+        return [self._order[j] for j in self._collect(start_ms, end_ms)]
+
+    def next_after(self, time_ms):
+        """
+        Finds the first subtitle starting at or after a given time.
+
+        Returns:
+            int or None: Index into the original list, or None if there is none
+        """
+        j = bisect_left(self._starts, time_ms)
+        return self._order[j] if j < len(self._order) else None
+
+    def overlaps(self):
+        """
+        Enumerates every pair of overlapping subtitles.
+
+        Each subtitle is compared only with the following ones that start
+        before it ends, found by binary search, so the cost is
+        O(n log n + number of overlaps).
+
+        Returns:
+            list: Tuples (i, j) of indexes into the original list, with the
+                  subtitle at i starting no later than the one at j
+        """
+        pairs = []
+        starts = self._starts
+        for a in range(len(starts)):
+            end = self._ends[a]
+            stop = bisect_left(starts, end, a + 1)
+            for b in range(a + 1, stop):
+                # Los intervalos vacíos no se solapan con nada
+                if self._ends[b] > starts[b]:
+                    pairs.append((self._order[a], self._order[b]))
+        return pairs
@@ -0,0 +1,400 @@
+"""
+Streaming validation of input files before conversion.
+
+The file is read in chunks and each item is decoded and checked on its own:
+structure, required fields, timecode syntax (frames below fps) and ordering.
+Every issue carries the item index and its byte offset in the file (line
+number for CSV/TSV), so a bad timecode deep in a long file is reported
+without loading the file or converting the items before it.
+"""
+import re
+import json
+import codecs
+
+from utils.input_adapters import TABULAR_EXTENSIONS, iter_tabular_rows
+
+REQUIRED_FIELDS = ("IN", "OUT", "DIÁLOGO")
+
+# Gravedad de las incidencias: los errores hacen fallar la validación, los
+# avisos solo con strict
+ERROR = "error"
+WARNING = "warning"
+
+_TIMECODE = re.compile(r"\s*(\d+):(\d{1,2}):(\d{1,2}):(\d{1,3})\s*\Z")
+# Forma habitual "hh:mm:ss:ff", comprobada primero por ser la más rápida
+_PLAIN_TIMECODE = re.compile(r"(\d\d):([0-5]\d):([0-5]\d):(\d\d)\Z")
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_CHUNK_SIZE = 1 << 20
+
+
+class ValidationError(ValueError):
+    """Raised when an input file does not pass validation; carries the issues found."""
+
+    def __init__(self, path, issues):
+        self.path = path
+        self.issues = issues
+        first = issues[0]
+        super().__init__(f"Invalid input {path}: {format_issue(first)}"
+                         + (f" (and {len(issues) - 1} more)" if len(issues) > 1 else ""))
+
+
+def format_issue(issue):
+    """Formats an issue as "item 12 (byte 3456): message"."""
+    where = []
+    if issue.get("item") is not None:
+        where.append(f"item {issue['item']}")
+    if issue.get("offset") is not None:
+        where.append(f"byte {issue['offset']}")
+    if issue.get("line") is not None:
+        where.append(f"line {issue['line']}")
+    location = where[0] + (f" ({', '.join(where[1:])})" if len(where) > 1 else "") if where else "file"
+    return f"{location}: {issue['message']}"
+
+
+def _issue(code, message, severity=ERROR, item=None, offset=None, line=None, field=None):
+    issue = {"severity": severity, "code": code, "message": message, "item": item}
+    if offset is not None:
+        issue["offset"] = offset
+    if line is not None:
+        issue["line"] = line
+    if field is not None:
+        issue["field"] = field
+    return issue
+
+
+def parse_timecode(text, fps=25):
+    """
+    Parses a "hh:mm:ss:ff" timecode into a frame count, checking each part.
+
+    Returns:
+        tuple: (frames, None) or (None, reason) if the timecode is invalid
+    """
+    if not isinstance(text, str):
+        return None, f"expected a string, got {type(text).__name__}"
+    match = _TIMECODE.match(text)
+    if not match:
+        return None, f"'{text}' is not hh:mm:ss:ff"
+    h, m, s, f = map(int, match.groups())
+    if m >= 60 or s >= 60:
+        return None, f"'{text}' has minutes or seconds above 59"
+    if f >= fps:
+        return None, f"'{text}' has frame {f}, not below fps {fps}"
+    return ((h * 60 + m) * 60 + s) * fps + f, None
+
+
+class ItemChecker:
+    """Checks items one by one, remembering what is needed for the ordering checks."""
+
+    def __init__(self, fps=25):
+        self.fps = fps
+        self.previous_start = None
+        self.items = 0
+
+    def _frames(self, text):
+        """Frame count of a well-formed "hh:mm:ss:ff" timecode, or None."""
+        match = _PLAIN_TIMECODE.match(text)
+        if match is None:
+            return None
+        h, m, s, f = match.groups()
+        f = int(f)
+        if f >= self.fps:
+            return None
+        return ((int(h) * 60 + int(m)) * 60 + int(s)) * self.fps + f
+
+    def check(self, item, index, **location):
+        """
+        Returns the issues of one item (a decoded JSON value or CSV row).
+        """
+        self.items += 1
+        # Camino rápido para el caso habitual: elemento completo y en orden
+        try:
+            start = self._frames(item["IN"])
+            end = self._frames(item["OUT"])
+            valid = (start is not None and end is not None and start <= end
+                     and type(item["DIÁLOGO"]) is str
+                     and type(item.get("PERSONAJE")) in (str, type(None))
+                     and (self.previous_start is None or start >= self.previous_start))
+        except (KeyError, TypeError):
+            valid = False
+        if valid:
+            self.previous_start = start
+            return ()
+        return self._issues(item, index, location)
+
+    def _issues(self, item, index, location):
+        """Detailed checks of an item that did not pass the fast path."""
+        if not isinstance(item, dict):
+            return [_issue("structure", f"expected an object, got {type(item).__name__}", item=index, **location)]
+
+        issues = []
+        for field in REQUIRED_FIELDS:
+            if field not in item:
+                issues.append(_issue("missing_field", f"missing {field}", item=index, field=field, **location))
+        if "DIÁLOGO" in item and not isinstance(item["DIÁLOGO"], str):
+            issues.append(_issue("type", f"DIÁLOGO must be a string, got {type(item['DIÁLOGO']).__name__}",
+                                 item=index, field="DIÁLOGO", **location))
+        if "PERSONAJE" in item and item["PERSONAJE"] is not None and not isinstance(item["PERSONAJE"], str):
+            issues.append(_issue("type", f"PERSONAJE must be a string, got {type(item['PERSONAJE']).__name__}",
+                                 item=index, field="PERSONAJE", **location))
+
+        times = {}
+        for field in ("IN", "OUT"):
+            if field in item:
+                frames, reason = parse_timecode(item[field], self.fps)
+                if reason:
+                    issues.append(_issue("timecode", f"{field}: {reason}", item=index, field=field, **location))
+                else:
+                    times[field] = frames
+
+        if "IN" in times and "OUT" in times and times["OUT"] < times["IN"]:
+            issues.append(_issue("ordering", f"OUT {item['OUT']} is before IN {item['IN']}",
+                                 WARNING, item=index, field="OUT", **location))
+        if "IN" in times:
+            if self.previous_start is not None and times["IN"] < self.previous_start:
+                issues.append(_issue("ordering", f"IN {item['IN']} is before the previous item's IN",
+                                     WARNING, item=index, field="IN", **location))
+            self.previous_start = times["IN"]
+        return issues
+
+
+class _JsonStream:
+    """
+    Incremental reader over a JSON file that decodes one value at a time and
+    keeps the byte offset of the current position.
+    """
+
+    def __init__(self, f):
+        self.f = f
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.json_decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        # Desplazamiento en bytes de buf[self.mark]
+        self.mark = 0
+        self.mark_bytes = 0
+
+    def fill(self):
+        """Reads one more chunk, dropping what was already consumed. Returns False at EOF."""
+        if self.eof:
+            return False
+        data = self.f.read(_CHUNK_SIZE)
+        self.offset(self.pos)
+        self.buf = self.buf[self.pos:]
+        self.pos = self.mark = 0
+        if not data:
+            self.eof = True
+            self.buf += self.decoder.decode(b"", final=True)
+        else:
+            self.buf += self.decoder.decode(data)
+        return True
+
+    def offset(self, pos):
+        """Byte offset of a position in the buffer (positions must not go backwards)."""
+        piece = self.buf[self.mark:pos]
+        self.mark_bytes += len(piece) if piece.isascii() else len(piece.encode("utf-8"))
+        self.mark = pos
+        return self.mark_bytes
+
+    def peek(self):
+        """Skips whitespace and returns the next character, or "" at the end of the file."""
+        while True:
+            self.pos = _WHITESPACE.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self.fill():
+                return ""
+
+    def value(self):
+        """
+        Decodes the value at the current position, reading more if it is cut
+        by the chunk end.
+
+        Returns:
+            tuple: (value, position where it starts in the current buffer)
+        """
+        while True:
+            try:
+                value, end = self.json_decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as e:
+                truncated = e.pos >= len(self.buf) - 6 or e.msg.startswith("Unterminated string")
+                if truncated and self.fill():
+                    continue
+                raise
+            # Un número al final del bloque puede continuar en el siguiente
+            if end == len(self.buf) and not self.eof and self.fill():
+                continue
+            start, self.pos = self.pos, end
+            return value, start
+
+
+def _iter_json_items(stream):
+    """
+    Yields (index, position, item) for each item of a JSON input. The byte
+    offset of the position is stream.offset(position), valid until the next
+    item is requested.
+
+    Raises:
+        _JsonStructureError: With the byte offset where the structure breaks
+    """
+
+    def fail(message, pos=None):
+        raise _JsonStructureError(message, stream.offset(stream.pos if pos is None else pos))
+
+    def items():
+        # Estamos justo después de '['
+        stream.pos += 1
+        if stream.peek() == "]":
+            stream.pos += 1
+            fail("no items: the list is empty")
+        index = 0
+        while True:
+            if not stream.peek():
+                fail("unexpected end of file inside the list")
+            try:
+                item, start = stream.value()
+            except json.JSONDecodeError as e:
+                fail(f"invalid JSON: {e.msg}", e.pos)
+            yield index, start, item
+            index += 1
+            c = stream.peek()
+            if c == ",":
+                stream.pos += 1
+            elif c == "]":
+                stream.pos += 1
+                return
+            else:
+                fail(f"expected ',' or ']' after item {index - 1}")
+
+    c = stream.peek()
+    if c == "\ufeff":
+        fail("file starts with a byte order mark (save it as UTF-8 without BOM)")
+    if c == "[":
+        yield from items()
+    elif c == "{":
+        stream.pos += 1
+        found = False
+        while True:
+            c = stream.peek()
+            if c == "}":
+                stream.pos += 1
+                break
+            try:
+                key, _ = stream.value()
+            except json.JSONDecodeError as e:
+                fail(f"invalid JSON: {e.msg}", e.pos)
+            if not isinstance(key, str) or stream.peek() != ":":
+                fail("expected a key and ':' in the top-level object")
+            stream.pos += 1
+            if key == "data":
+                if stream.peek() != "[":
+                    fail("'data' must be a list of items")
+                found = True
+                yield from items()
+            else:
+                stream.peek()
+                try:
+                    stream.value()
+                except json.JSONDecodeError as e:
+                    fail(f"invalid JSON: {e.msg}", e.pos)
+            c = stream.peek()
+            if c == ",":
+                stream.pos += 1
+            elif c != "}":
+                fail("expected ',' or '}' in the top-level object")
+        if not found:
+            fail("no 'data' list in the top-level object")
+    elif not c:
+        fail("the file is empty")
+    else:
+        fail("expected a list of items or an object with 'data'")
+
+    if stream.peek():
+        fail("unexpected data after the end of the JSON")
+
+
+class _JsonStructureError(Exception):
+    def __init__(self, message, offset):
+        super().__init__(message)
+        self.offset = offset
+
+
+def iter_issues(path, fps=25, input_options=None, checker=None):
+    """
+    Validates an input file in one streaming pass, yielding each issue as it is found.
+
+    Args:
+        path (str): JSON, CSV or TSV input
+        fps (int): Frames per second of the timecodes
+        input_options (dict): Options for CSV/TSV inputs (see utils.input_adapters)
+        checker (ItemChecker): Checker to use; after the pass its "items"
+            attribute holds the number of items read
+
+    Yields:
+        dict: Issue with "severity" (error/warning), "code", "message", "item"
+              (0-based index), "offset" (bytes, JSON) or "line" (CSV/TSV)
+              and "field" when it concerns one field
+    """
+    checker = checker or ItemChecker(fps)
+    try:
+        if path.lower().endswith(TABULAR_EXTENSIONS):
+            rows = iter_tabular_rows(path, **(input_options or {}))
+            header = next(rows, None)
+            if header is None:
+                yield _issue("structure", "the file is empty", line=1)
+                return
+            missing = [field for field in REQUIRED_FIELDS if field not in header[0]]
+            if missing:
+                yield _issue("missing_field", f"header has no column for {', '.join(missing)}", line=1)
+                return
+            for line, item in rows:
+                for field in ("IN", "OUT"):
+                    # Celdas vacías: la fila se descartaría igual que un elemento sin IN/OUT
+                    if field in item and not item[field]:
+                        del item[field]
+                yield from checker.check(item, checker.items, line=line)
+        else:
+            with open(path, "rb") as f:
+                stream = _JsonStream(f)
+                for index, position, item in _iter_json_items(stream):
+                    issues = checker.check(item, index)
+                    if issues:
+                        # El desplazamiento en bytes solo se calcula cuando hay incidencias
+                        offset = stream.offset(position)
+                        for issue in issues:
+                            issue["offset"] = offset
+                            yield issue
+    except _JsonStructureError as e:
+        yield _issue("structure", str(e), offset=e.offset)
+    except UnicodeDecodeError as e:
+        yield _issue("encoding", f"not valid text in the expected encoding: {e.reason}")
+
+
+def validate_file(path, fps=25, fail_fast=False, strict=False, input_options=None):
+    """
+    Validates an input file before conversion.
+
+    Args:
+        path (str): JSON, CSV or TSV input
+        fps (int): Frames per second of the timecodes
+        fail_fast (bool): Raise on the first error instead of collecting every issue
+        strict (bool): Treat warnings (ordering) as errors
+        input_options (dict): Options for CSV/TSV inputs
+
+    Returns:
+        dict: Report with "file", "items", "errors", "warnings" and "issues"
+
+    Raises:
+        ValidationError: On the first error when fail_fast is True
+    """
+    checker = ItemChecker(fps)
+    issues = []
+    for issue in iter_issues(path, fps, input_options, checker):
+        if strict and issue["severity"] == WARNING:
+            issue["severity"] = ERROR
+        issues.append(issue)
+        if fail_fast and issue["severity"] == ERROR:
+            raise ValidationError(path, issues[-1:])
+
+    errors = sum(1 for issue in issues if issue["severity"] == ERROR)
+    return {"file": path, "items": checker.items, "errors": errors, "warnings": len(issues) - errors, "issues": issues}